@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import threading
+import time
+from typing import Callable, MutableMapping
+
+import requests
+
+
+class CircuitOpenError(Exception):
+    "A request refused without being sent, since the circuit of its endpoint is open"
+
+
+class CircuitBreaker:
+    """
+    Circuit of each endpoint family (host and path), opened by `failures` failed requests in a row
+    An open circuit refuses the requests of its family with CircuitOpenError, after `cooldown` seconds a single probe request
+    is let through: its success closes the circuit, its failure opens it for another cool-down
+    A failure is a request that raised (timeout, connection error) or an answer with a 5xx or 429 status
+    With `pause` the streams stop before their next slice once a circuit opened, so the run checkpoints and ends early,
+    otherwise the first refused request fails the sync. 0 `failures` disables the breaker
+    """
+
+    def __init__(self, failures: int = 0, cooldown: float = 60, pause: bool = True):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.pause = pause
+        # Family -> failed requests in a row, time the circuit opened or None while closed, whether a probe is in flight
+        self.circuits: MutableMapping[str, list] = {}
+        self.lock = threading.Lock()
+
+    def before(self, family: str):
+        with self.lock:
+            circuit = self.circuits.get(family)
+            if circuit is None or circuit[1] is None:
+                return
+            failures, opened, probing = circuit
+            if probing or time.monotonic() - opened < self.cooldown:
+                raise CircuitOpenError(
+                    f"The circuit of {family} is open after {failures} failed requests in a row, no request is sent for {self.cooldown} seconds"
+                )
+            circuit[2] = True
+
+    def after(self, family: str, failed: bool):
+        with self.lock:
+            if not failed:
+                self.circuits.pop(family, None)
+                return
+            circuit = self.circuits.setdefault(family, [0, None, False])
+            circuit[0] += 1
+            if circuit[2] or circuit[0] >= self.failures:
+                circuit[1] = time.monotonic()
+            circuit[2] = False
+
+    def call(self, family: str, call: Callable[[], requests.Response]) -> requests.Response:
+        "Answer of call(), unless the circuit of the family is open"
+        if not self.failures:
+            return call()
+        self.before(family)
+        try:
+            response = call()
+        except requests.RequestException:
+            self.after(family, failed=True)
+            raise
+        self.after(family, failed=response.status_code >= 500 or response.status_code == 429)
+        return response
+
+    @property
+    def paused(self) -> bool:
+        "Whether the streams should stop before their next slice"
+        with self.lock:
+            return self.pause and any(opened is not None for _, opened, _ in self.circuits.values())
@@ -0,0 +1,26 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Requests paced to `rate` per second across all the threads sharing the limiter, each request waits for its turn
+    0 `rate` disables the limiter
+    """
+
+    def __init__(self, rate: float = 0):
+        self.interval = 1 / rate if rate else 0
+        self.next_turn = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            turn = max(now, self.next_turn)
+            self.next_turn = turn + self.interval
+        time.sleep(turn - now)
@@ -1,13 +1,18 @@
 
 from abc import ABC
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Iterable, List, Mapping, MutableMapping, Optional, Tuple
 
 import requests, time
 from airbyte_cdk.sources import AbstractSource
-from airbyte_cdk.models import SyncMode
+from airbyte_cdk.models import FailureType, SyncMode
 from airbyte_cdk.sources.streams import Stream, IncrementalMixin
 from airbyte_cdk.sources.streams.http import HttpStream, HttpSubStream
 from airbyte_cdk.sources.streams.http.auth import TokenAuthenticator, NoAuth
+from airbyte_cdk.utils.traced_exception import AirbyteTracedException
+from .circuit import CircuitBreaker, CircuitOpenError
+from .hedging import HedgedAdapter, Hedger
+from .rate_limiter import RateLimiter
 
 class Organization(HttpStream):
     url_base = None
@@ -21,6 +26,11 @@ class Organization(HttpStream):
             self.fast_mode = config['fast_mode']
         except:
             self.fast_mode = False
+        self.circuit = CircuitBreaker(config.get('circuit_failures', 0), config.get('circuit_cooldown', 60), config.get('circuit_mode', 'pause') == 'pause')
+        self.hedger = Hedger(circuit=self.circuit)
+        for prefix in ("https://", "http://"):
+            self._session.mount(prefix, HedgedAdapter(self.hedger))
+        self._organizations = None
 
     def next_page_token(self, response: requests.Response) -> Optional[Mapping[str, Any]]:
         return None
@@ -78,12 +88,35 @@ class Organization(HttpStream):
         else:
             return response
 
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        "The organization list is requested once per sync, the overview stream sharing this instance as its parent reads it from memory"
+        if self._organizations is None:
+            self._organizations = list(super().read_records(sync_mode=sync_mode, stream_slice=stream_slice, **kwargs))
+        yield from self._organizations
+
 class OrganizationSubStream(HttpSubStream, Organization, ABC):
 
     raise_on_http_errors = False
  
     def __init__(self, config: Mapping[str, Any], parent: Organization, **kwargs):
         super().__init__(config=config, parent=parent, **kwargs)
+
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        "A refused request fails the sync with either circuit_mode, see circuit_failure"
+        try:
+            # Organization.read_records keeps the organization list, the slices of a sub stream are read over HTTP
+            yield from HttpStream.read_records(self, sync_mode=sync_mode, stream_slice=stream_slice, **kwargs)
+        except CircuitOpenError as error:
+            raise self.circuit_failure(f"{error}, the slice {stream_slice} was cut off") from error
+
+    def circuit_failure(self, reason: str) -> AirbyteTracedException:
+        """
+        A full refresh has no next run to leave the organizations left to: ended early it would replace the synced data with part of it,
+        so an open circuit fails the sync, circuit_mode pause only stops it before its next slice instead of at the next request
+        """
+        return AirbyteTracedException(
+            message="The API kept failing, the sync stopped before all organizations were read", internal_message=reason, failure_type=FailureType.transient_error
+        )
  
     def parse_response(self, response: requests.Response, **kwargs) -> Iterable[Mapping]:
         yield response.json()
@@ -91,14 +124,54 @@ class OrganizationSubStream(HttpSubStream, Organization, ABC):
 class OrganizationOverview(OrganizationSubStream):
     primary_key = 'ticker'
 
+    def __init__(self, config: Mapping[str, Any], parent: Organization, **kwargs):
+        super().__init__(config=config, parent=parent, **kwargs)
+        self.overview_workers = config.get('overview_workers', 8)
+        self.rate_limiter = RateLimiter(config.get('requests_per_second', 0))
+        self._prefetched: MutableMapping[str, Future] = {}
+
     def path(self, *, stream_state: Mapping[str, Any] = None, stream_slice: Mapping[str, Any] = None,
              next_page_token: Mapping[str, Any] = None) -> str:
         return f'https://apipubaws.tcbs.com.vn/tcanalysis/v1/ticker/{stream_slice["ticker"]}/overview'
  
     def stream_slices(self, **kwargs) -> Iterable[Optional[Mapping[str, any]]]:
-        for stream_slices in self.parent.stream_slices(sync_mode=SyncMode.full_refresh):
-            for record in self.parent.read_records(sync_mode=SyncMode.full_refresh, stream_slice=stream_slices):
-                yield {"ticker": record["ticker"]}
+        """
+        One slice per organization of the parent's list, the overviews of the next organizations are requested
+        by overview_workers threads while a slice is read, all of them paced by the shared requests_per_second
+        """
+        tickers = [record["ticker"] for record in self.parent.read_records(sync_mode=SyncMode.full_refresh)]
+        with ThreadPoolExecutor(max_workers=self.overview_workers, thread_name_prefix="overview") as executor:
+            try:
+                for position, ticker in enumerate(tickers):
+                    # Keep a couple of requests per worker ahead of the slice being read, so their answers do not pile up
+                    for upcoming in tickers[position:position + 2 * self.overview_workers]:
+                        if upcoming not in self._prefetched:
+                            self._prefetched[upcoming] = executor.submit(self.fetch_overview, upcoming)
+                    if self.circuit.paused:
+                        raise self.circuit_failure(f"A circuit opened before {ticker}")
+                    yield {"ticker": ticker}
+            finally:
+                # Overviews not requested yet are dropped, so leaving the executor does not wait for them
+                for future in self._prefetched.values():
+                    future.cancel()
+                self._prefetched.clear()
+
+    def fetch_overview(self, ticker: str) -> requests.Response:
+        "Request an overview in a worker thread, once the rate limiter gives it a turn"
+        self.rate_limiter.wait()
+        return self.hedger.get(self.path(stream_slice={"ticker": ticker}), self.request_headers(stream_state={}))
+
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        """
+        Read the prefetched overview of the slice, a prefetch that failed or should be retried is requested again with the usual retries
+        That request waits for its turn of the rate limiter as well, its retries are spaced by the backoff
+        """
+        future = self._prefetched.pop(stream_slice["ticker"], None)
+        if future is not None and future.exception() is None and not self.should_retry(future.result()):
+            yield from self.parse_response(future.result())
+        else:
+            self.rate_limiter.wait()
+            yield from super().read_records(sync_mode=sync_mode, stream_slice=stream_slice, **kwargs)
  
     def parse_response(self, response: requests.Response, **kwargs) -> Iterable[Mapping]:
         yield response.json()
@@ -111,7 +184,9 @@ class SourceSsiOrganization(AbstractSource):
 
     def streams(self, config: Mapping[str, Any]) -> List[Stream]:
         auth = NoAuth() 
+        # A single Organization is both a stream and the parent of the overviews, so the list is requested once per sync
+        organization = Organization(config=config, authenticator=auth)
         return [
-            Organization(config=config, authenticator=auth), 
-            OrganizationOverview(parent=Organization(config=config, authenticator=auth), config=config, authenticator=auth)
+            organization, 
+            OrganizationOverview(parent=organization, config=config, authenticator=auth)
         ]
@@ -0,0 +1,90 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import time
+from unittest.mock import MagicMock
+
+from airbyte_cdk.models import SyncMode
+from airbyte_cdk.utils.traced_exception import AirbyteTracedException
+from pytest import fixture, raises
+from source_ssi_organization.source import SourceSsiOrganization
+
+ORGANIZATIONS = [{"ticker": "TCB"}, {"ticker": "ABC"}, {"ticker": "VNM"}]
+
+
+def overview(ticker, status_code=200):
+    "Answer of the overview endpoint"
+    return MagicMock(status_code=status_code, json=MagicMock(return_value={"ticker": ticker}))
+
+
+def http_read(*args, stream_slice=None, **kwargs):
+    "Records of a request with the usual retries: the organization list, or the overview of a slice"
+    return iter(ORGANIZATIONS if stream_slice is None else [{"ticker": stream_slice["ticker"]}])
+
+
+@fixture
+def http_requests(mocker):
+    return mocker.patch("source_ssi_organization.source.HttpStream.read_records", side_effect=http_read)
+
+
+@fixture
+def streams():
+    return SourceSsiOrganization().streams({"overview_workers": 2})
+
+
+def read(stream):
+    return [record for stream_slice in stream.stream_slices() for record in stream.read_records(SyncMode.full_refresh, stream_slice=stream_slice)]
+
+
+def test_organization_list_is_requested_once_for_both_streams(http_requests, streams):
+    organization, organization_overview = streams
+    organization_overview.fetch_overview = overview
+
+    assert list(organization.read_records(SyncMode.full_refresh)) == ORGANIZATIONS
+    assert read(organization_overview) == ORGANIZATIONS
+    assert http_requests.call_count == 1
+
+
+def test_overviews_are_emitted_in_the_order_of_the_list(http_requests, streams):
+    _, organization_overview = streams
+
+    def fetch_overview(ticker):
+        # The first overviews are answered last
+        time.sleep({"TCB": 0.2, "ABC": 0.1, "VNM": 0}[ticker])
+        return overview(ticker)
+
+    organization_overview.fetch_overview = fetch_overview
+    assert read(organization_overview) == ORGANIZATIONS
+
+
+def test_overview_to_retry_is_requested_again(http_requests, streams):
+    _, organization_overview = streams
+    organization_overview.fetch_overview = lambda ticker: overview(ticker, 503 if ticker == "ABC" else 200)
+    organization_overview.rate_limiter = MagicMock()
+
+    assert read(organization_overview) == ORGANIZATIONS
+    # The list, then the overview of ABC with the usual retries, after its turn of the rate limiter
+    assert http_requests.call_count == 2
+    assert http_requests.call_args.kwargs["stream_slice"] == {"ticker": "ABC"}
+    organization_overview.rate_limiter.wait.assert_called_once()
+
+
+def test_open_circuit_fails_the_full_refresh(http_requests, streams):
+    _, organization_overview = streams
+    organization_overview.fetch_overview = overview
+    organization_overview.circuit = MagicMock(paused=True)
+
+    with raises(AirbyteTracedException):
+        read(organization_overview)
+    assert organization_overview._prefetched == {}
+
+
+def test_overviews_prefetched_for_a_stopped_read_are_dropped(http_requests, streams):
+    _, organization_overview = streams
+    organization_overview.fetch_overview = overview
+
+    slices = organization_overview.stream_slices()
+    assert next(slices) == {"ticker": "TCB"}
+    slices.close()
+    assert organization_overview._prefetched == {}
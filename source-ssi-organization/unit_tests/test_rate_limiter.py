@@ -0,0 +1,25 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from source_ssi_organization.rate_limiter import RateLimiter
+
+
+def test_threads_share_the_rate():
+    rate_limiter = RateLimiter(20)
+    start = time.monotonic()
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(lambda _: rate_limiter.wait(), range(6)))
+    # The first request goes right away, the 5 others wait for their turn
+    assert time.monotonic() - start >= 5 / 20
+
+
+def test_no_rate_does_not_wait():
+    rate_limiter = RateLimiter(0)
+    start = time.monotonic()
+    for _ in range(1000):
+        rate_limiter.wait()
+    assert time.monotonic() - start < 0.1
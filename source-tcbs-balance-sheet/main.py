@@ -7,7 +7,11 @@ import sys
 
 from airbyte_cdk.entrypoint import launch
 from source_tcbs_balance_sheet import SourceTcbsBalanceSheet
+from source_tcbs_balance_sheet.plan import plan
 
 if __name__ == "__main__":
     source = SourceTcbsBalanceSheet()
-    launch(source, sys.argv[1:])
+    if sys.argv[1:2] == ["plan"]:
+        plan(source, sys.argv[2:])
+    else:
+        launch(source, sys.argv[1:])
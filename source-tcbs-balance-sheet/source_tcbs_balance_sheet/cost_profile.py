@@ -0,0 +1,76 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import json
+import os
+from typing import Iterable, Mapping, MutableMapping, Optional, Tuple
+
+import requests
+
+
+class CostProfile:
+    """
+    Requests, bytes and latency of each ticker, learned over the runs and kept in a JSON sidecar file
+    {"TCB": {"requests": 412.0, "bytes": 7612.5, "seconds": 0.182}} -> 412 requests per run, 7.6 KB and 182 ms per request
+    Each run is folded into the profile as an exponential moving average, tickers that were not requested keep their profile
+    Without a path the profile is empty and nothing is written
+    """
+
+    def __init__(self, path: Optional[str] = None, smoothing: float = 0.5):
+        self.path = path
+        self.smoothing = smoothing
+        self.profile: MutableMapping[str, MutableMapping[str, float]] = self.load()
+        self.run: MutableMapping[str, list] = {}
+
+    def load(self) -> MutableMapping[str, MutableMapping[str, float]]:
+        "A missing or unreadable profile only costs the estimates, it never fails the sync"
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, ticker: str, response: requests.Response):
+        "Count a response of the ticker in the current run"
+        if self.path is None:
+            return
+        cost = self.run.setdefault(ticker, [0, 0, 0.0])
+        cost[0] += 1
+        cost[1] += len(response.content or b"")
+        cost[2] += response.elapsed.total_seconds()
+
+    def save(self):
+        "Fold the current run into the profile and replace the sidecar file"
+        if self.path is None or not self.run:
+            return
+        for ticker, (request_count, size, seconds) in self.run.items():
+            observed = {"requests": request_count, "bytes": size / request_count, "seconds": seconds / request_count}
+            previous = self.profile.get(ticker, observed)
+            self.profile[ticker] = {key: round(previous[key] + self.smoothing * (value - previous[key]), 4) for key, value in observed.items()}
+        self.run = {}
+
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.profile, file, separators=(",", ":"), sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def estimate(self, ticker: str, request_count: Optional[float] = None) -> Optional[Tuple[float, float, float]]:
+        "Requests, bytes and seconds the ticker is expected to cost, for `request_count` requests or as many as a usual run"
+        cost = self.profile.get(ticker)
+        if cost is None:
+            return None
+        request_count = cost["requests"] if request_count is None else request_count
+        return request_count, request_count * cost["bytes"], request_count * cost["seconds"]
+
+    def describe(self, tickers: Iterable[str], request_counts: Mapping[str, int] = None) -> str:
+        "Estimate of a whole run to log before it starts, for the planned `request_counts` of the tickers when they are known"
+        tickers = list(tickers)
+        estimates = [self.estimate(ticker, (request_counts or {}).get(ticker)) for ticker in tickers]
+        estimates = [estimate for estimate in estimates if estimate is not None]
+        request_count, size, seconds = (sum(values) for values in zip(*estimates)) if estimates else (0, 0, 0)
+        return (
+            f"Cost profile of {len(estimates)} out of {len(tickers)} symbols: about {request_count:.0f} requests, "
+            f"{size / 1e6:.1f} MB and {seconds:.0f} seconds of requests"
+        )
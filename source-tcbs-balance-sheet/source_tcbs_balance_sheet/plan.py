@@ -0,0 +1,85 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+"""
+Dry run of a sync: python main.py plan --config secrets/config.json [--state state.json]
+Prints the slices and requests each stream would issue per symbol, with the bytes and time its `Cost profile` expects for them
+Only the symbol list is requested, no data is fetched
+"""
+import argparse
+import json
+from typing import Any, Iterable, List, Mapping, Optional
+
+from airbyte_cdk.sources import AbstractSource
+
+
+def stream_state(state: Any, stream_name: str) -> Optional[Mapping[str, Any]]:
+    "State of a stream, from a list of per-stream state messages as given to read, a legacy state object or the stream state itself"
+    if isinstance(state, list):
+        for message in state:
+            stream = message.get("stream", {})
+            if stream.get("stream_descriptor", {}).get("name") == stream_name:
+                return stream.get("stream_state")
+        return None
+    if isinstance(state, dict):
+        return state.get(stream_name, state)
+    return None
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1000:
+            return f"{size:.0f} {unit}"
+        size /= 1000
+    return f"{size:.1f} GB"
+
+
+def format_rows(stream_name: str, rows: List[Mapping[str, Any]], cost_profile) -> Iterable[str]:
+    """
+    Per symbol line and stream total, slices and requests are None when neither earlier runs nor the state tell how many are needed
+    Seconds are the sum of the request latencies, the wall time is lower with concurrent workers
+    """
+    totals = {"slices": 0, "requests": 0, "bytes": 0.0, "seconds": 0.0, "unknown": 0}
+    lines = []
+    for row in rows:
+        estimate = cost_profile.estimate(row["ticker"], row["requests"]) if row["requests"] else None
+        if row["requests"] == 0:
+            estimate = 0, 0.0, 0.0
+        totals["slices"] += row["slices"] or 0
+        totals["requests"] += row["requests"] or 0
+        if estimate is None:
+            totals["unknown"] += 1
+        if estimate is not None:
+            totals["bytes"] += estimate[1]
+            totals["seconds"] += estimate[2]
+        slices, requests = ("?" if row[key] is None else row[key] for key in ("slices", "requests"))
+        size, seconds = (format_size(estimate[1]), f"{estimate[2]:.1f} s") if estimate is not None else ("?", "?")
+        lines.append(f"  {row['ticker']:<8} {slices:>6} slices {requests:>6} requests {size:>9} {seconds:>9}")
+
+    yield (
+        f"{stream_name}: {len(rows)} symbols, {totals['slices']} slices, {totals['requests']} requests, "
+        f"{format_size(totals['bytes'])}, {totals['seconds']:.0f} s of requests ({totals['unknown']} symbols without estimate)"
+    )
+    yield from lines
+
+
+def plan(source: AbstractSource, args: List[str]):
+    parser = argparse.ArgumentParser(prog="main.py plan", description="Print the requests a read would issue, without fetching data")
+    parser.add_argument("--config", required=True, help="path to the json configuration file")
+    parser.add_argument("--state", help="path to the json state file, as given to read")
+    parsed_args = parser.parse_args(args)
+
+    config = source.read_config(parsed_args.config)
+    state = None
+    if parsed_args.state:
+        with open(parsed_args.state) as file:
+            state = json.load(file)
+
+    for stream in source.streams(config):
+        if not hasattr(stream, "plan"):
+            continue
+        value = stream_state(state, stream.name)
+        if value:
+            stream.state = value
+        for line in format_rows(stream.name, list(stream.plan()), stream.cost_profile):
+            print(line)
@@ -2,15 +2,22 @@
 # Copyright (c) 2023 Airbyte, Inc., all rights reserved.
 #
 
+import zlib
 from abc import ABC
-from typing import Any, Iterable, List, Mapping, Optional, Tuple
-from airbyte_cdk.models import SyncMode
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple
+from airbyte_cdk.models import FailureType, SyncMode
 
 import requests
 from airbyte_cdk.sources import AbstractSource
 from airbyte_cdk.sources.streams import Stream
 from airbyte_cdk.sources.streams.http import HttpStream, HttpSubStream
 from airbyte_cdk.sources.streams.http.auth import NoAuth
+from airbyte_cdk.utils.traced_exception import AirbyteTracedException
+from .cost_profile import CostProfile
+from .circuit import CircuitBreaker, CircuitOpenError
+from .hedging import HedgedAdapter, Hedger
+from .negative_cache import NegativeCache
+from .universe import SymbolUniverse
 
 class Symbol(HttpStream):
     url_base = None
@@ -21,11 +28,21 @@ class Symbol(HttpStream):
         "Cache symbol list to disk to prevent calling the URL everytime we get price history"
         return True
 
-    def __init__(self, config: Mapping[str, Any], **kwargs):
+    def __init__(self, config: Mapping[str, Any], universe: SymbolUniverse = None, **kwargs):
         super().__init__()
 
         self.fast_mode = config["Fast mode"]
-        self.url = config["Symbol URL"]
+        self.universe = universe or SymbolUniverse(config)
+        self.shard_index = config.get("Shard index", 0)
+        self.shard_count = config.get("Shard count", 1)
+        self.circuit = CircuitBreaker(config.get("Circuit failures", 0), config.get("Circuit cool-down", 60), config.get("Circuit mode", "pause") == "pause")
+        self.hedger = Hedger(
+            config.get("Connect timeout", 10), config.get("Read timeout", 60), config.get("Hedge percentile", 0), config.get("Hedge ratio", 0.05), circuit=self.circuit
+        )
+        for prefix in ("https://", "http://"):
+            self._session.mount(prefix, HedgedAdapter(self.hedger))
+        self.cost_profile = CostProfile(config.get("Cost profile"))
+        self.negative_cache = NegativeCache(config.get("Negative cache"), config.get("Negative cache TTL", 7))
     
     def next_page_token(self, response: requests.Response):
         "The API does not offer pagination, so we return None to indicate there are no more pages in the response"
@@ -41,7 +58,7 @@ class Symbol(HttpStream):
         Complete the URL to ingest data. Airbyte see concat url_base + path() as URL
         Since the base URL stored in config (Can not be assigned to url_base before init), we will store the full URL in path()
         """
-        return self.url
+        return self.universe.url
 
     def parse_response(
         self,
@@ -52,15 +69,53 @@ class Symbol(HttpStream):
     ) -> Iterable[Mapping]:    
         """
         The symbol file content will look like this "VVS,XDC,HSV,CST,BVL,SGI,TOS,VTZ,SSH,BCA,GMH,BIG"
-        So this function collect the text and transform to a list of symbol
+        So this function collect the text and transform to a list of symbol, SSI's organization list is filtered instead, see universe
         """
-        response = response.text.split(",")
+        response = [symbol for symbol in self.universe.parse(response) if self.in_shard(symbol)]
         return response[:5] if self.fast_mode else response
 
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[str]:
+        "Symbols of the `Symbol source`, through the `Symbol cache` when there is one"
+        symbols = [symbol for symbol in self.universe.symbols(self.hedger) if self.in_shard(symbol)]
+        return symbols[:5] if self.fast_mode else symbols
+
+    def in_shard(self, symbol: str) -> bool:
+        "Keep the symbols of this connection's shard, crc32 is stable across processes while hash() is salted per process"
+        return zlib.crc32(symbol.encode()) % self.shard_count == self.shard_index
+
 class SymbolSubStream(HttpSubStream, Symbol, ABC):
     raise_on_http_errors = False 
     def __init__(self, config: Mapping[str, Any], parent: Symbol, **kwargs):
-        super().__init__(config=config, parent=parent, **kwargs)
+        # The symbol list is requested once, by the parent
+        super().__init__(config=config, parent=parent, universe=parent.universe, **kwargs)
+
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        # Symbol.read_records gives the symbol list, the slices of a sub stream are read over HTTP
+        records = HttpStream.read_records(self, sync_mode=sync_mode, stream_slice=stream_slice, **kwargs)
+        yield from self.until_circuit_opens(records, stream_slice)
+
+    def until_circuit_opens(self, records: Iterable[Mapping[str, Any]], stream_slice: Any) -> Iterable[Mapping[str, Any]]:
+        "Records of a slice, a refused request fails the sync with either `Circuit mode`, see circuit_failure"
+        try:
+            yield from records
+        except CircuitOpenError as error:
+            raise self.circuit_failure(f"{error}, the slice {stream_slice} was cut off") from error
+
+    def circuit_failure(self, reason: str) -> AirbyteTracedException:
+        """
+        A full refresh has no next run to leave the symbols left to: ended early it would replace the synced data with part of it,
+        so an open circuit fails the sync, the `Circuit mode` pause only stops it before its next slice instead of at the next request
+        """
+        return AirbyteTracedException(
+            message="The TCBS API kept failing, the sync stopped before all symbols were read", internal_message=reason, failure_type=FailureType.transient_error
+        )
+
+    def skip_negative(self, symbols: Iterable[str], url: Callable[[str], str]) -> List[str]:
+        "Symbols to request, the ones the `Negative cache` had nothing for within its TTL are logged and skipped until their re-probe"
+        symbols, skipped = self.negative_cache.select(symbols, url)
+        if skipped:
+            self.logger.info(f"Negative cache: skipped {len(skipped)} symbols without data within the last {self.negative_cache.ttl} days: {','.join(skipped)}")
+        return symbols
 
 class BalanceSheet(SymbolSubStream):
 
@@ -69,23 +124,48 @@ class BalanceSheet(SymbolSubStream):
         return f'https://apipubaws.tcbs.com.vn/tcanalysis/v1/finance/{stream_slice["record"]}/balancesheet?yearly={stream_slice["period"]}&isAll=true'
     
     def stream_slices(self, **kwargs) -> Iterable[Optional[Mapping[str, any]]]:
-        for record in self.parent.read_records(sync_mode=SyncMode.full_refresh):
+        """
+        Quarterly and yearly report of each symbol, the `Cost profile` estimates the run up front and learns from it once all slices were read
+        Symbols whose reports were both empty or missing are skipped while the `Negative cache` holds them
+        """
+        symbols = self.skip_negative(self.parent.read_records(sync_mode=SyncMode.full_refresh), self.report_url)
+        self.logger.info(self.cost_profile.describe(symbols, dict.fromkeys(symbols, 2)))
+        for position, record in enumerate(symbols):
+            if self.circuit.paused:
+                raise self.circuit_failure(f"A circuit opened, {len(symbols) - position} symbols were not read: {','.join(symbols[position:])}")
             for i in range(2):
                 yield {"record": record, "period" : i}
+        self.cost_profile.save()
+        self.negative_cache.save()
+
+    def plan(self) -> Iterable[Mapping[str, Any]]:
+        "Slices and requests of each symbol for the plan command: the quarterly and the yearly report"
+        for record in self.skip_negative(self.parent.read_records(sync_mode=SyncMode.full_refresh), self.report_url):
+            yield {"ticker": record, "slices": 2, "requests": 2}
     
     def parse_response(self, response: requests.Response, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping]:
-        response = response.json()
-        for element in response:
-            yield element
+        self.cost_profile.record(stream_slice["record"], response)
+        if response.status_code == 404:
+            self.negative_cache.record(stream_slice["record"], response)
+            return
+        records = response.json()
+        self.negative_cache.record(stream_slice["record"], response, bool(records))
+        yield from records
+
+    def report_url(self, symbol: str) -> str:
+        "URL of the symbol's quarterly report, it names the endpoint family of the `Negative cache`"
+        return self.path(stream_slice={"record": symbol, "period": 0})
 
 # Source
 class SourceTcbsBalanceSheet(AbstractSource):
     def check_connection(self, logger, config) -> Tuple[bool, any]:
         "Test the connector, check for invalid arguments"
         try:
-            requests.get(config["Symbol URL"]).text.split(",")
+            SymbolUniverse(config).symbols(Hedger(config.get("Connect timeout", 10), config.get("Read timeout", 60)))
         except:
             return False, "Invalid URL or invalid file content format"
+        if not 0 <= config.get("Shard index", 0) < config.get("Shard count", 1):
+            return False, "Shard index must be between 0 and Shard count - 1"
         return True, None
 
     def streams(self, config: Mapping[str, Any]) -> List[Stream]:
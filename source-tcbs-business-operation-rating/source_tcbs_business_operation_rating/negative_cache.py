@@ -0,0 +1,75 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import json
+import os
+from datetime import date, timedelta
+from typing import Callable, Iterable, List, MutableMapping, Optional, Tuple
+
+import requests
+
+from .hedging import endpoint_family
+
+
+class NegativeCache:
+    """
+    Tickers an endpoint family had nothing for, kept in a JSON sidecar file so that the next runs skip them for `ttl` days
+    {"apipubaws.tcbs.com.vn/tcanalysis/v1/rating/*/general": {"XYZ": "2023-06-23"}} -> XYZ had no general rating on 2023-06-23
+    A ticker is recorded when all of its answers of the run were a 404 or empty, an answer with data removes it,
+    other errors tell nothing either way. Once its `ttl` ran out the ticker is requested again: that re-probe records it
+    for another `ttl`, or catches a re-listing
+    Without a path nothing is skipped and nothing is written
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: int = 7):
+        self.path = path
+        self.ttl = ttl
+        self.cache: MutableMapping[str, MutableMapping[str, str]] = self.load()
+        self.run: MutableMapping[Tuple[str, str], bool] = {}
+
+    def load(self) -> MutableMapping[str, MutableMapping[str, str]]:
+        "A missing or unreadable cache only costs the skipped requests, it never fails the sync"
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def skip(self, url: str, ticker: str) -> bool:
+        "Whether the ticker had nothing at the family of `url` less than `ttl` days ago"
+        recorded = self.cache.get(endpoint_family(url), {}).get(ticker)
+        return recorded is not None and date.today() - date.fromisoformat(recorded) < timedelta(self.ttl)
+
+    def select(self, tickers: Iterable[str], url: Callable[[str], str]) -> Tuple[List[str], List[str]]:
+        "Tickers to request and tickers skipped, `url` gives a URL of the family for a ticker"
+        selected, skipped = [], []
+        for ticker in tickers:
+            (skipped if self.skip(url(ticker), ticker) else selected).append(ticker)
+        return selected, skipped
+
+    def record(self, ticker: str, response: requests.Response, found: bool = True):
+        "Count an answer of the ticker in the current run, `found` tells whether a successful answer held any data"
+        if self.path is None or not (response.ok or response.status_code == 404):
+            return
+        key = (endpoint_family(response.request.url), ticker)
+        self.run[key] = self.run.get(key, False) or (response.ok and found)
+
+    def save(self):
+        "Fold the answers of the current run into the cache and replace the sidecar file"
+        if self.path is None or not self.run:
+            return
+        today = date.today().isoformat()
+        for (family, ticker), found in self.run.items():
+            tickers = self.cache.setdefault(family, {})
+            if found:
+                tickers.pop(ticker, None)
+            else:
+                tickers[ticker] = today
+        self.run = {}
+
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.cache, file, separators=(",", ":"), sort_keys=True)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,183 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Mapping, Optional
+
+import requests
+
+from .hedging import Hedger
+
+ORGANIZATION_LIST_URL = "https://fiin-core.ssi.com.vn/Master/GetListOrganization?language=vi"
+ORGANIZATION_LIST_HEADERS = {
+    "X-Fiin-Key": "KEY",
+    "X-Fiin-User-ID": "ID",
+    "X-Fiin-Seed": "SEED",
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36",
+    "Origin": "https://iboard.ssi.com.vn",
+    "Referer": "https://iboard.ssi.com.vn/",
+}
+BARS_URL = "https://apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term?ticker={ticker}&type=stock&resolution=D&from={start}&to={end}"
+
+
+def organization_symbols(
+    organizations: Iterable[Mapping[str, Any]],
+    exchanges: Iterable[str] = (),
+    types: Iterable[str] = (),
+    equities_only: bool = True,
+    industries: Iterable[str] = (),
+) -> List[str]:
+    """
+    Tickers of SSI's organization list, in the order of the list
+    An organization is kept when its exchange (comGroupCode) is one of `exchanges`, its type (comTypeCode) one of `types`
+    and its ICB code (icbCode) starts with one of `industries`, empty meaning any: ICB codes nest, "8" is financials and "8355" banks
+    With `equities_only` only three letter tickers are kept, as util.ipynb did to build symbol.txt
+    """
+    exchanges, types, industries = set(exchanges), set(types), tuple(industries)
+    return [
+        organization["ticker"]
+        for organization in organizations
+        if organization.get("ticker")
+        and (not exchanges or organization.get("comGroupCode") in exchanges)
+        and (not types or organization.get("comTypeCode") in types)
+        and (not industries or (organization.get("icbCode") or "").startswith(industries))
+        and (not equities_only or len(organization["ticker"]) == 3)
+    ]
+
+
+class SymbolUniverse:
+    """
+    Symbol list of the connector, from the `Symbol source`: the comma separated file at `Symbol URL`,
+    or SSI's organization list (GetListOrganization), which drops the tickers that are no longer listed without maintaining a file
+    The list is filtered before any slice is planned, in this order:
+    `Include symbols` keeps the listed ones only and `Exclude symbols` drops the listed ones,
+    `Symbol exchanges`, `Symbol types` and `Symbol industries` keep the organizations that match, the file source looks them up
+    in the organization list, then `Minimum average volume` keeps the symbols whose daily bars of the last `Volume days` reach it,
+    which costs a request per symbol: the volumes are only requested when the list is
+    With a `Symbol cache` the list is kept in a JSON sidecar file and not requested again for `Symbol cache hours`,
+    a list that can not be requested falls back to the cached one however old it is
+    Within a process the list is only built once: the streams of a sync share the universe of the symbol stream
+    """
+
+    def __init__(self, config: Mapping[str, Any]):
+        self.source = config.get("Symbol source", "file")
+        self.url = ORGANIZATION_LIST_URL if self.source == "ssi" else config["Symbol URL"]
+        self.exchanges = config.get("Symbol exchanges", [])
+        self.types = config.get("Symbol types", [])
+        self.industries = config.get("Symbol industries", [])
+        self.equities_only = config.get("Three letter symbols only", True)
+        self.include = config.get("Include symbols", [])
+        self.exclude = config.get("Exclude symbols", [])
+        self.minimum_volume = config.get("Minimum average volume", 0)
+        self.volume_days = config.get("Volume days", 30)
+        self.cache_path = config.get("Symbol cache")
+        self.cache_hours = config.get("Symbol cache hours", 24)
+        self.listed: Optional[List[str]] = None
+        # A cache written for another source or other filters is not used
+        self.identity = [
+            self.url,
+            sorted(self.exchanges),
+            sorted(self.types),
+            sorted(self.industries),
+            self.equities_only,
+            sorted(self.include),
+            sorted(self.exclude),
+            self.minimum_volume,
+            self.volume_days,
+        ]
+
+    def parse(self, response: requests.Response) -> List[str]:
+        "Symbols of an answer of the source, before the filters"
+        if self.source == "ssi":
+            return organization_symbols(response.json()["items"], equities_only=self.equities_only)
+        return response.text.split(",")
+
+    def request(self, hedger: Hedger) -> List[str]:
+        "Symbols of the source that pass the filters"
+        organizations = None
+        if self.source == "ssi" or self.exchanges or self.types or self.industries:
+            response = hedger.get(ORGANIZATION_LIST_URL, ORGANIZATION_LIST_HEADERS)
+            response.raise_for_status()
+            organizations = response.json()["items"]
+        if self.source == "ssi":
+            symbols = organization_symbols(organizations, equities_only=self.equities_only)
+        else:
+            response = hedger.get(self.url)
+            response.raise_for_status()
+            symbols = self.parse(response)
+
+        include, exclude = set(self.include), set(self.exclude)
+        symbols = [symbol for symbol in symbols if (not include or symbol in include) and symbol not in exclude]
+        if organizations is not None:
+            matching = set(organization_symbols(organizations, self.exchanges, self.types, False, self.industries))
+            symbols = [symbol for symbol in symbols if symbol in matching]
+        if self.minimum_volume:
+            volumes = self.average_volumes(hedger, symbols)
+            # A symbol whose bars could not be requested is kept, it is filtered the next time the list is requested
+            symbols = [symbol for symbol in symbols if volumes[symbol] is None or volumes[symbol] >= self.minimum_volume]
+        return symbols
+
+    def average_volumes(self, hedger: Hedger, symbols: List[str]) -> Mapping[str, Optional[float]]:
+        "Average daily volume of each symbol over its bars of the last `Volume days`, None when the bars could not be requested"
+        end = int(time.time())
+        start = end - self.volume_days * 86400
+
+        def average_volume(symbol: str) -> Optional[float]:
+            try:
+                response = hedger.get(BARS_URL.format(ticker=symbol, start=start, end=end))
+                bars = response.json()["data"] if response.ok else None
+            except (requests.RequestException, ValueError, KeyError):
+                return None
+            if bars is None:
+                return None
+            return sum(bar["volume"] for bar in bars) / len(bars) if bars else 0
+
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix="volume") as executor:
+            return dict(zip(symbols, executor.map(average_volume, symbols)))
+
+    def cached(self, max_age: Optional[float]) -> Optional[List[str]]:
+        "Symbols of the cache of the same source and filters when it is younger than `max_age` seconds, of any age without one"
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path) as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if cache.get("source") != self.identity or max_age is not None and time.time() - cache["saved"] > max_age:
+            return None
+        return cache["symbols"]
+
+    def save(self, symbols: List[str]):
+        "Replace the sidecar file, it is only read back for the same source and filters"
+        temporary_path = f"{self.cache_path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"source": self.identity, "saved": time.time(), "symbols": symbols}, file, separators=(",", ":"))
+        os.replace(temporary_path, self.cache_path)
+
+    def symbols(self, hedger: Hedger) -> List[str]:
+        "Symbols of the source, built on the first call only"
+        if self.listed is None:
+            self.listed = self.load(hedger)
+        return self.listed
+
+    def load(self, hedger: Hedger) -> List[str]:
+        "Symbols of the source, taken from the cache while it is fresh"
+        symbols = self.cached(self.cache_hours * 3600)
+        if symbols is not None:
+            return symbols
+        try:
+            symbols = self.request(hedger)
+        except (requests.RequestException, ValueError, KeyError):
+            symbols = self.cached(None)
+            if symbols is None:
+                raise
+            return symbols
+        if self.cache_path:
+            self.save(symbols)
+        return symbols
@@ -7,7 +7,11 @@ import sys
 
 from airbyte_cdk.entrypoint import launch
 from source_tcbs_cash_flow import SourceTcbsCashFlow
+from source_tcbs_cash_flow.plan import plan
 
 if __name__ == "__main__":
     source = SourceTcbsCashFlow()
-    launch(source, sys.argv[1:])
+    if sys.argv[1:2] == ["plan"]:
+        plan(source, sys.argv[2:])
+    else:
+        launch(source, sys.argv[1:])
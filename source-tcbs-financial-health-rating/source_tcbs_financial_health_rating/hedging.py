@@ -0,0 +1,146 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Mapping, MutableMapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .circuit import CircuitBreaker
+
+# Threads sending the hedged requests, the widest fan-out of requests in flight at once
+HEDGE_WORKERS = 32
+
+
+def endpoint_family(url: str) -> str:
+    """
+    Requests sharing their latency profile: the host and path, with the ticker in the path left out
+    'https://apipubaws.tcbs.com.vn/tcanalysis/v1/rating/TCB/general?fType=TICKER' -> 'apipubaws.tcbs.com.vn/tcanalysis/v1/rating/*/general'
+    """
+    parts = urlsplit(url)
+    return parts.netloc + "/".join("*" if segment.isupper() else segment for segment in parts.path.split("/"))
+
+
+def close_response(attempt: Future):
+    "Drop the slower answer of a hedged request once it arrived"
+    if attempt.exception() is None:
+        attempt.result().close()
+
+
+class Hedger:
+    """
+    Connect and read timeouts of the requests, and hedging of the slow ones, behind the circuit breaker of their endpoint family
+    With a `percentile`, a GET still unanswered after that percentile of the latencies of its endpoint family is sent again,
+    the first answer is used and the other one is dropped. Latencies are learned over the last `samples` answers of the family,
+    no request is hedged before `min_samples` of them, and hedges stay within `max_ratio` of the requests sent
+    The GETs share a session whose pool keeps a connection alive for each request that can be in flight
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 10,
+        read_timeout: float = 60,
+        percentile: float = 0,
+        max_ratio: float = 0.05,
+        samples: int = 200,
+        min_samples: int = 20,
+        circuit: CircuitBreaker = None,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.circuit = circuit or CircuitBreaker()
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.latencies: MutableMapping[str, Deque[float]] = {}
+        self.samples = samples
+        self.sent = 0
+        self.hedged = 0
+        self.lock = threading.Lock()
+        self.executor = None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=HEDGE_WORKERS)
+        for prefix in ("https://", "http://"):
+            self.session.mount(prefix, adapter)
+
+    def observe(self, family: str, seconds: float):
+        with self.lock:
+            self.latencies.setdefault(family, deque(maxlen=self.samples)).append(seconds)
+
+    def threshold(self, family: str) -> Optional[float]:
+        "Latency after which a request of the family is hedged, None until enough answers were seen"
+        with self.lock:
+            latencies = sorted(self.latencies.get(family, ()))
+        if not self.percentile or len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))]
+
+    def allow_hedge(self) -> bool:
+        with self.lock:
+            if self.hedged + 1 > self.max_ratio * self.sent:
+                return False
+            self.hedged += 1
+            return True
+
+    def send(self, family: str, call: Callable[[], requests.Response]) -> requests.Response:
+        "Answer of call(), refused while the circuit of its family is open"
+        return self.circuit.call(family, lambda: self.hedge(family, call))
+
+    def hedge(self, family: str, call: Callable[[], requests.Response]) -> requests.Response:
+        "Answer of call(), hedged when it is slower than the threshold of its family"
+        with self.lock:
+            self.sent += 1
+        threshold = self.threshold(family)
+        started = time.monotonic()
+        if threshold is None:
+            response = call()
+            self.observe(family, time.monotonic() - started)
+            return response
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+        attempts = [self.executor.submit(call)]
+        done, _ = wait(attempts, timeout=threshold)
+        if not done and self.allow_hedge():
+            attempts.append(self.executor.submit(call))
+        winner = None
+        pending = set(attempts)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((attempt for attempt in done if attempt.exception() is None), None)
+        for attempt in pending:
+            attempt.add_done_callback(close_response)
+        if winner is None:
+            raise attempts[0].exception()
+        self.observe(family, time.monotonic() - started)
+        return winner.result()
+
+    def get(self, url: str, headers: Mapping[str, str] = None, validate: Callable[[requests.Response], Any] = None) -> requests.Response:
+        "`validate` looks at the answer before the circuit does, an answer it raises a RequestException for is a failed request"
+
+        def call() -> requests.Response:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if validate is not None:
+                validate(response)
+            return response
+
+        return self.send(endpoint_family(url), call)
+
+
+class HedgedAdapter(HTTPAdapter):
+    "Transport of a stream's session: requests without a timeout get the Hedger's, GETs are hedged"
+
+    def __init__(self, hedger: Hedger, **kwargs):
+        super().__init__(**kwargs)
+        self.hedger = hedger
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.hedger.timeout
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+        return self.hedger.send(endpoint_family(request.url), lambda: super(HedgedAdapter, self).send(request, **kwargs))
@@ -0,0 +1,49 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import json
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+import requests
+
+
+def apply(body: bytes, function: Optional[Callable], args: tuple) -> Any:
+    "Decode a response body and shape it, in a worker process"
+    value = json.loads(body)
+    return value if function is None else function(value, *args)
+
+
+class DecodePool:
+    """
+    Worker processes decoding the JSON of responses and shaping their records, so the process reading the stream only emits them
+    `function` gets the decoded JSON and `args`, it must be defined at module level to reach the workers, and its result is
+    pickled back: records already filtered against the cursor cost less to unpickle than the page costs to decode
+    Without workers the function runs in the calling thread, the result is then a Future that is already done
+    The pool only pays off where a response is decoded while earlier ones are emitted, a response whose result is awaited
+    right away is decoded `inline` instead of paying the round trip to a worker
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self.executor = None
+
+    def decode(self, response: requests.Response, function: Optional[Callable] = None, *args, inline: bool = False) -> Future:
+        if inline or not self.workers:
+            future = Future()
+            try:
+                value = response.json()
+                future.set_result(value if function is None else function(value, *args))
+            except Exception as exception:
+                future.set_exception(exception)
+            return future
+        if self.executor is None:
+            # Spawned, since forking a process that runs request threads can copy a held lock
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor.submit(apply, response.content, function, args)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
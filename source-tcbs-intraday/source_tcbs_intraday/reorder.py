@@ -0,0 +1,66 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import pickle
+import tempfile
+from typing import Any, Iterator, MutableMapping, Tuple
+
+from .ticks import TickColumns
+
+
+class ReorderBuffer:
+    """
+    Release the pages of a symbol in order while they are fetched in any order
+    Pages are pushed with their position in the page walk, pages waiting for an earlier one are held as TickColumns
+    Once `max_ticks` ticks are held, the pages that arrive are spilled to a temporary file until their turn comes
+    """
+
+    def __init__(self, max_ticks: int):
+        self.max_ticks = max_ticks
+        self.next_position = 0
+        self.held = 0
+        self.pages: MutableMapping[int, TickColumns] = {}
+        self.spilled: MutableMapping[int, Tuple[int, int]] = {}
+        self.spill_file = None
+
+    def __enter__(self) -> "ReorderBuffer":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def push(self, position: int, ticks: TickColumns):
+        if position != self.next_position and self.held + len(ticks) > self.max_ticks:
+            self.spill(position, ticks)
+        else:
+            self.pages[position] = ticks
+            self.held += len(ticks)
+
+    def ready(self) -> Iterator[MutableMapping[str, Any]]:
+        "Records of the pages that are next in order, as dicts"
+        while self.next_position in self.pages or self.next_position in self.spilled:
+            ticks = self.take(self.next_position)
+            self.next_position += 1
+            yield from ticks.records()
+
+    def take(self, position: int) -> TickColumns:
+        if position in self.pages:
+            ticks = self.pages.pop(position)
+            self.held -= len(ticks)
+            return ticks
+        offset, size = self.spilled.pop(position)
+        self.spill_file.seek(offset)
+        return pickle.loads(self.spill_file.read(size))
+
+    def spill(self, position: int, ticks: TickColumns):
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="tcbs-intraday-")
+        data = pickle.dumps(ticks, protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self.spill_file.seek(0, 2)
+        self.spill_file.write(data)
+        self.spilled[position] = (offset, len(data))
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
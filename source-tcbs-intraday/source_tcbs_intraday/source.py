@@ -1,15 +1,30 @@
 #
 # Copyright (c) 2023 Airbyte, Inc., all rights reserved.
 #
-import requests, time
+import requests, zlib
 from abc import ABC
-from typing import Any, Iterable, List, Mapping, Optional, Tuple
-from datetime import datetime, date
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple
+from datetime import datetime
 from airbyte_cdk.models import SyncMode
 from airbyte_cdk.sources import AbstractSource
 from airbyte_cdk.sources.streams import Stream, IncrementalMixin
 from airbyte_cdk.sources.streams.http import HttpStream, HttpSubStream
 from airbyte_cdk.sources.streams.http.auth import NoAuth
+from .budget import Budget
+from .cost_profile import CostProfile
+from .circuit import CircuitBreaker, CircuitOpenError
+from .hedging import HedgedAdapter, Hedger
+from .negative_cache import NegativeCache
+from .universe import SymbolUniverse
+from .decode_pool import DecodePool
+from .reorder import ReorderBuffer
+from .spool import Spool, SpoolFile
+from .state import decode_complete, decode_holes, decode_liquidity, decode_pending, decode_state, encode_state
+from .ticks import TickColumns
+from .trading_calendar import EXCHANGE_HOLIDAYS, TradingCalendar
+from .work_queue import WorkQueue
 
 class Symbol(HttpStream, IncrementalMixin):
     url_base = None
@@ -29,15 +44,42 @@ class Symbol(HttpStream, IncrementalMixin):
         }
         """
         
-        response = requests.get(self.url).text.split(",")
+        response = [symbol for symbol in self.universe.symbols(self.hedger) if self.in_shard(symbol)]
         _cursor_value =  dict.fromkeys(response, -1)
-        _cursor_date = {"date": date.today()}
+        _cursor_date = {"date": self.calendar.session_date()}
         return _cursor_date | _cursor_value
+
+    def paging_url(self, symbol: str, page: int, size: int) -> str:
+        """
+        URL example: 'https://apipubaws.tcbs.com.vn/stock-insight/v1/intraday/TCB/his/paging?page=0&size=50&headIndex=-1'
+        headIndex=-1 reads the last session's tape, it is used when there is no session today or the market has not opened yet
+        """
+        url = f'https://apipubaws.tcbs.com.vn/stock-insight/v1/intraday/{symbol}/his/paging?page={page}&size={size}'
+        if self.calendar.session_date() < self.calendar.now().date():
+            url += '&headIndex=-1'
+        return url
     
-    def get_page_list(self, symbol):
-        url = f'https://apipubaws.tcbs.com.vn/stock-insight/v1/intraday/{symbol}/his/paging?page=0&size=1'
-        page_amount = requests.get(url).json()["total"]
-        page_num = page_amount//self.page_size
+    def get_head(self, symbol: str) -> Optional[int]:
+        """
+        Amount of trades of the session so far, which is also the id the next trade will get, None when the API failed to answer it
+        A 5xx or 429 is counted by the circuit of the paging endpoint, an answer that is not a page is counted as a failure as well
+        """
+        self.budget.spend()
+        try:
+            response = self.hedger.get(self.paging_url(symbol, 0, 1), validate=lambda response: response.json() if response.ok else None)
+            self.cost_profile.record(symbol, response)
+            self.negative_cache.record(symbol, response)
+            if response.status_code == 404:
+                return 0
+            response.raise_for_status()
+        except requests.RequestException as error:
+            self.logger.warning(f"The head of {symbol} could not be read, it is read first next run: {error!r}")
+            return None
+        return response.json()["total"]
+
+    def get_page_list(self, head: int):
+        "Pages of a snapshot of the tape holding `head` trades, from the oldest to the newest"
+        page_num = (head - 1)//self.page_size
         return [i for i in range (page_num, -1, -1)]        
         
     @property  
@@ -45,24 +87,134 @@ class Symbol(HttpStream, IncrementalMixin):
         "Cache symbol list to disk to prevent calling the URL everytime we get price history"
         return True
 
-    def __init__(self, config: Mapping[str, Any], **kwargs):
+    def __init__(self, config: Mapping[str, Any], universe: SymbolUniverse = None, **kwargs):
         super().__init__()
 
         self.fast_mode = config["Fast mode"]
-        self.url = config["Symbol URL"]
+        self.universe = universe or SymbolUniverse(config)
+        self.shard_index = config.get("Shard index", 0)
+        self.shard_count = config.get("Shard count", 1)
+        self.circuit = CircuitBreaker(config.get("Circuit failures", 0), config.get("Circuit cool-down", 60), config.get("Circuit mode", "pause") == "pause")
+        self.hedger = Hedger(
+            config.get("Connect timeout", 10), config.get("Read timeout", 60), config.get("Hedge percentile", 0), config.get("Hedge ratio", 0.05), circuit=self.circuit
+        )
+        for prefix in ("https://", "http://"):
+            self._session.mount(prefix, HedgedAdapter(self.hedger))
         self.page_size = config["Page size"]
+        self.calendar = TradingCalendar(EXCHANGE_HOLIDAYS + tuple(config.get("Holidays", [])))
+        self.cost_profile = CostProfile(config.get("Cost profile"))
+        self.negative_cache = NegativeCache(config.get("Negative cache"), config.get("Negative cache TTL", 7))
+        self.decode_pool = DecodePool(config.get("Decode workers", 0))
+        self.budget = Budget(config.get("Time budget", 0), config.get("Request budget", 0))
         self._cursor_value = self.reset_cursor_value()
+        self._complete = set()
+        self._holes = {}
+        self._liquidity = {}
+        self._pending = []
+        self._state = None
+        self._moved = False
+        self._reading = False
 
     @property
     def state(self) -> Mapping[str, Any]:
-        "Return the _cursor_value to show on UI at Connection > Settings  > Advanced"
-        return self._cursor_value
+        """
+        Return the _cursor_value to show on UI at Connection > Settings  > Advanced
+        The encoded state is cached and only rebuilt after a cursor moved, since Airbyte reads it after every slice and every record
+        Cursors moved while a slice is read are only encoded once the slice was read
+        """
+        if self._moved and not self._reading:
+            self._state = None
+            self._moved = False
+        if self._state is None:
+            self._state = encode_state(self._cursor_value, self._complete, self._holes, self._liquidity, self._pending)
+            if self.shard_count > 1:
+                # Each shard only holds the cursors of its own symbols, the tag tells the shard states apart when they are merged to reshard
+                self._state["shard"] = f"{self.shard_index}/{self.shard_count}"
+        return self._state
     
     @state.setter
     def state(self, value: Mapping[str, Any]):
         "Update _cursor_value with latest timestamp in ingested record"
-        self._cursor_value = value
-        self._cursor_value["date"] = datetime.strptime(value["date"], '%Y-%m-%d').date()
+        cursors = decode_state(value)
+        for key in self._cursor_value:
+            if key in cursors:
+                self._cursor_value[key] = cursors[key]
+        # Airbyte hands an empty state to a first sync, its cursors start at the current session
+        self._cursor_value["date"] = datetime.strptime(cursors["date"], '%Y-%m-%d').date() if "date" in cursors else self.calendar.session_date()
+        self._complete = {symbol for symbol in decode_complete(value) if symbol in self._cursor_value}
+        self._holes = {symbol: holes for symbol, holes in decode_holes(value).items() if symbol in self._cursor_value}
+        self._liquidity = {symbol: size for symbol, size in decode_liquidity(value).items() if symbol in self._cursor_value}
+        self._pending = [symbol for symbol in decode_pending(value) if symbol in self._cursor_value]
+        self._state = None
+
+    def update_cursor(self, symbol: str, record_id: int):
+        "Move a symbol's cursor, the cached state is rebuilt once it is read outside of a slice"
+        self._cursor_value[symbol] = record_id
+        self._moved = True
+
+    def start_session(self):
+        "Reset the cursors once a new session has started"
+        if self._cursor_value["date"] < self.calendar.session_date():
+            self._cursor_value = self.reset_cursor_value()
+            self._complete = set()
+            self._holes = {}
+            self._pending = []
+            self._state = None
+
+    def add_holes(self, symbol: str, ids: Iterable[int]):
+        "Remember ids that were not ingested while later ones were"
+        ids = set(ids)
+        if ids:
+            self._holes.setdefault(symbol, set()).update(ids)
+            self._state = None
+
+    def fill_hole(self, symbol: str, record_id: int):
+        self._holes[symbol].discard(record_id)
+        if not self._holes[symbol]:
+            del self._holes[symbol]
+        self._moved = True
+
+    def is_covered(self, symbol: str, head: int) -> bool:
+        "Whether every id of a tape holding `head` trades was ingested"
+        return self._cursor_value[symbol] >= head - 1 and symbol not in self._holes
+
+    def hole_pages(self, symbol: str, head: int) -> set:
+        "Pages of a snapshot of `head` trades holding a hole of the symbol, each hole is looked at once instead of once per page"
+        return {(head - 1 - record_id) // self.page_size for record_id in self._holes.get(symbol, ()) if 0 <= record_id < head}
+
+    def update_liquidity(self, symbol: str, head: int, session_closed: bool):
+        """
+        Size class of the symbol's tape: the bit length of its amount of trades, 1000 trades -> 10
+        It is set from the final tape after the close and only grows during a session, so the morning runs still see yesterday's liquidity
+        """
+        size = head.bit_length()
+        if size != self._liquidity.get(symbol) and (session_closed or size > self._liquidity.get(symbol, -1)):
+            self._liquidity[symbol] = size
+            self._state = None
+
+    def by_liquidity(self, symbols: Iterable[str]) -> List[str]:
+        "Order symbols from the most to the least liquid, symbols never seen before come first since their cost is unknown"
+        return sorted(symbols, key=lambda symbol: -self._liquidity.get(symbol, float("inf")))
+
+    def schedule(self, symbols: Iterable[str]) -> List[str]:
+        "Symbols left by the last run first, in their order, then the others from the most liquid"
+        pending = {symbol: position for position, symbol in enumerate(self._pending)}
+        return sorted(self.by_liquidity(symbols), key=lambda symbol: pending.get(symbol, len(pending)))
+
+    @property
+    def halted(self) -> bool:
+        "No further slice is read once the budget is spent, or once a circuit opened with the `Circuit mode` pause"
+        return self.budget.exhausted or self.circuit.paused
+
+    def set_pending(self, symbols: List[str]):
+        "Remember the symbols a spent budget left, they are read first next run"
+        self._pending = symbols
+        self._state = None
+
+    def mark_complete(self, symbol: str):
+        "Remember that the symbol's whole tape was read after the session closed, so it is skipped until the next session"
+        self._complete.add(symbol)
+        self._state = None
 
     def next_page_token(self, response: requests.Response):
         "The API does not offer pagination, so we return None to indicate there are no more pages in the response"
@@ -78,7 +230,7 @@ class Symbol(HttpStream, IncrementalMixin):
         Complete the URL to ingest data. Airbyte see concat url_base + path() as URL
         Since the base URL stored in config (Can not be assigned to url_base before init), we will store the full URL in path()
         """
-        return self.url
+        return self.universe.url
 
     def parse_response(
         self,
@@ -89,74 +241,389 @@ class Symbol(HttpStream, IncrementalMixin):
     ) -> Iterable[Mapping]:    
         """
         The symbol file content will look like this "VVS,XDC,HSV,CST,BVL,SGI,TOS,VTZ,SSH,BCA,GMH,BIG"
-        So this function collect the text and transform to a list of symbol
+        So this function collect the text and transform to a list of symbol, SSI's organization list is filtered instead, see universe
         """
-        response = response.text.split(",")
+        response = [symbol for symbol in self.universe.parse(response) if self.in_shard(symbol)]
         return response[:5] if self.fast_mode else response
 
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[str]:
+        "Symbols of the `Symbol source`, through the `Symbol cache` when there is one"
+        symbols = [symbol for symbol in self.universe.symbols(self.hedger) if self.in_shard(symbol)]
+        return symbols[:5] if self.fast_mode else symbols
+
+    def in_shard(self, symbol: str) -> bool:
+        "Keep the symbols of this connection's shard, crc32 is stable across processes while hash() is salted per process"
+        return zlib.crc32(symbol.encode()) % self.shard_count == self.shard_index
+
 class SymbolSubStream(HttpSubStream, Symbol, ABC):
     raise_on_http_errors = False 
 
     def __init__(self, config: Mapping[str, Any], parent: Symbol, **kwargs):
-        super().__init__(config=config, parent=parent, **kwargs)
+        # The symbol list is requested once, by the parent
+        super().__init__(config=config, parent=parent, universe=parent.universe, **kwargs)
+
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        # Symbol.read_records gives the symbol list, the slices of a sub stream are read over HTTP
+        records = HttpStream.read_records(self, sync_mode=sync_mode, stream_slice=stream_slice, **kwargs)
+        yield from self.until_circuit_opens(records, stream_slice)
+
+    def until_circuit_opens(self, records: Iterable[Mapping[str, Any]], stream_slice: Any) -> Iterable[Mapping[str, Any]]:
+        "Records of a slice, cut off without failing the sync when a circuit opens and the `Circuit mode` is pause"
+        try:
+            yield from records
+        except CircuitOpenError as error:
+            if not self.circuit.pause:
+                raise
+            self.logger.warning(f"{error}, the rest of the slice {stream_slice} is left for the next run")
+
+    def skip_negative(self, symbols: Iterable[str], url: Callable[[str], str]) -> List[str]:
+        "Symbols to request, the ones the `Negative cache` had nothing for within its TTL are logged and skipped until their re-probe"
+        symbols, skipped = self.negative_cache.select(symbols, url)
+        if skipped:
+            self.logger.info(f"Negative cache: skipped {len(skipped)} symbols without data within the last {self.negative_cache.ttl} days: {','.join(skipped)}")
+        return symbols
+
+
+def page_run(response: Mapping[str, Any], ticker: str, page: int, page_size: int, low: int, top: int) -> Tuple[int, List[Mapping[str, Any]], int, bool]:
+    """
+    Trades of a decoded page with an id in [low, top], oldest first with their ticker and id, and the id of the first one
+    Also gives the top left for the older pages and whether they may still hold trades of the range
+    Defined at module level so that a DecodePool worker can run it
+    """
+    data = response["data"]
+    newest_id = response["total"] - 1 - page_size * page
+    older = bool(data) and newest_id - len(data) >= low
+    # data is newest first: the trade at position i has id newest_id - i
+    first, last = max(0, newest_id - top), min(len(data), newest_id - low + 1)
+    if first >= last:
+        return 0, [], top, older
+    run = data[first:last][::-1]
+    for record_id, record in enumerate(run, newest_id - last + 1):
+        record["ticker"] = ticker
+        record["id"] = record_id
+    return newest_id - last + 1, run, newest_id - last, older
 
 
 class StockIntraday(SymbolSubStream):
     state_checkpoint_interval = None
 
+    def __init__(self, config: Mapping[str, Any], parent: Symbol, **kwargs):
+        super().__init__(config=config, parent=parent, **kwargs)
+
+        self.reconciliation = config.get("Reconciliation", False)
+        self.page_workers = config.get("Page workers", 1)
+        self.reorder_buffer_size = config.get("Reorder buffer size", 100000)
+        self.spool_directory = config.get("Spool directory")
+        self._spool = None
+        self.work_queue = WorkQueue(config["Work queue"], self.name, config.get("Work lease", 300)) if config.get("Work queue") else None
+
+    @property
+    def use_cache(self) -> bool:
+        "Only the symbol list is cached, a page of the tape changes while the session goes on"
+        return False
+
     def path(self, *, stream_state: Mapping[str, Any] = None, stream_slice: Mapping[str, Any] = None, next_page_token: Mapping[str, Any] = None) -> str:
-        "URL example: 'https://apipubaws.tcbs.com.vn/stock-insight/v1/intraday/TCB/his/paging?page=0&size=50&headIndex=-1'"
-        if datetime.now().weekday() > 4: #today is weekend
-            return f'https://apipubaws.tcbs.com.vn/stock-insight/v1/intraday/{stream_slice["symbol"]}/his/paging?page={stream_slice["page"]}&size={self.page_size}&headIndex=-1'
-        else:
-            return f'https://apipubaws.tcbs.com.vn/stock-insight/v1/intraday/{stream_slice["symbol"]}/his/paging?page={stream_slice["page"]}&size={self.page_size}'
+        return self.paging_url(stream_slice["symbol"], stream_slice["page"], self.page_size)
 
     def stream_slices(self, **kwargs) -> Iterable[Optional[Mapping[str, any]]]:
-        "Get the symbol list" 
-        for record in self.parent.read_records(sync_mode=SyncMode.full_refresh):
-            for page_num in self.get_page_list(record):
-                yield {"symbol": record, "page": page_num}
-    
-    def parse_response(self, response: requests.Response, **kwargs) -> Iterable[Mapping]:
-        response = response.json()
-        page = response["page"]
-        total = response["total"]
-        size = self.page_size
-        ticker = response["ticker"]
-
-        if page == total//size:
-            base_index = 0
-        else:
-            base_index = total - size * (page + 1)
+        """
+        Get the symbol list, symbols already read after the close of the current session are skipped without any request,
+        so runs on weekends and holidays only cost the symbols that were not complete yet
+        The head of the tape is pinned when a symbol starts, pages are numbered against that snapshot
+        and pages already ingested are not requested again
+        Symbols are read from the most to the least liquid of the previous runs, so the longest tapes do not end up last
+        With `Reconciliation` after the close, the pages holding the holes of a symbol are requested again as well,
+        and the symbols whose tape still does not match the final total are reported
+        With more than one `Page workers` a slice holds all the pages of a symbol, see read_pages
+        The requests of the run are folded into the `Cost profile` once all slices were read
+        Symbols the tape endpoint answered a 404 for are skipped until the `Negative cache TTL` ran out, an empty tape is not cached
+        since it is a usual session for an illiquid symbol
+        A symbol whose head the API failed to answer is skipped, it is read first next run
+        Once the `Time budget` or `Request budget` is spent, or a circuit opened with the `Circuit mode` pause,
+        no further slice is read, the symbols left are read first next run
+        With a `Work queue` the symbols are leased from the queue shared by the workers of the session instead, see work_queue
+        The last slice is a checkpoint without any request, which carries the last complete tape, the symbols left
+        and the cursors merged from the queue
+        """
+        self.start_session()
+        self.budget.start()
+        if self.work_queue is not None:
+            # The session is read again by every run while it is live, each run is a generation of the session's queue
+            self.work_queue.start(self._cursor_value["date"].isoformat(), rerun=True)
+            self.merge_work_queue()
+        incomplete = []
+        unanswered = []
+        deferred = []
+        symbols = [symbol for symbol in self.schedule(self.parent.read_records(sync_mode=SyncMode.full_refresh)) if symbol not in self._complete]
+        symbols = self.skip_negative(symbols, lambda symbol: self.paging_url(symbol, 0, 1))
+        self.logger.info(self.cost_profile.describe(symbols))
+        if self.work_queue is not None:
+            self.work_queue.seed(symbols)
+        for position, record in enumerate(self.work_queue.claim() if self.work_queue is not None else symbols):
+            if self.halted:
+                deferred = [record] if self.work_queue is not None else symbols[position:]
+                break
+            session_closed = self.calendar.is_session_closed()
+            reconcile = self.reconciliation and session_closed
+            head = self.get_head(record)
+            if head is None:
+                unanswered.append(record)
+                if self.work_queue is not None:
+                    self.work_queue.ack(record, [self._cursor_value[record], record in self._complete])
+                continue
+            self.update_liquidity(record, head, session_closed)
+            hole_pages = self.hole_pages(record, head) if reconcile else set()
+            pages = [
+                page_num
+                for page_num in self.get_page_list(head)
+                if self.page_ids(head, page_num)[1] > self._cursor_value[record] or page_num in hole_pages
+            ]
+            if self.page_workers > 1 and len(pages) > 1:
+                slices = [{"symbol": record, "pages": pages, "head": head}]
+            else:
+                slices = [{"symbol": record, "page": page_num, "head": head} for page_num in pages]
+            for stream_slice in slices:
+                if self.halted:
+                    deferred = [record] if self.work_queue is not None else symbols[position:]
+                    break
+                yield stream_slice
+            if deferred:
+                break
+            if session_closed and self.is_covered(record, head):
+                self.mark_complete(record)
+                if self._spool is not None:
+                    self._spool.discard(record)
+            elif reconcile:
+                incomplete.append(record)
+            if self._spool is not None:
+                self._spool.release(record)
+            if self.work_queue is not None:
+                self.work_queue.ack(record, [self._cursor_value[record], record in self._complete])
 
-        if base_index > self._cursor_value[ticker]:
-            response = response["data"]
-            response.reverse()
-            for record in response:
-                record["ticker"] = ticker
-                record["id"] = base_index + response.index(record)
-                yield record
+        if self.work_queue is not None:
+            # The symbol being read when the budget was spent goes back to the queue
+            if deferred:
+                self.work_queue.release(deferred[0])
+            self.merge_work_queue()
+        if incomplete:
+            self.logger.warning(f"Reconciliation could not complete the tape of {len(incomplete)} symbols: {','.join(incomplete)}")
+        if deferred:
+            reason = "A circuit opened" if self.circuit.paused else "Budget spent"
+            self.logger.warning(f"{reason} after {self.budget.spent} requests, {len(deferred)} symbols are left for the next run: {','.join(deferred)}")
+        self.set_pending(unanswered + deferred)
+        if self._spool is not None:
+            self._spool.close()
+        self.cost_profile.save()
+        self.negative_cache.save()
+        self.decode_pool.close()
+        # Airbyte emits the state after each slice is read and not once the slices ran out,
+        # the state set since the last symbol was read goes out with this last slice
+        yield {"checkpoint": True}
 
-    def read_records(self, *args, **kwargs) -> Iterable[Mapping[str, Any]]:
-        "Update symbol's cursor value with highest timestamp in corresponding symbol's record"
+    def merge_work_queue(self):
+        "Take the cursors and complete tapes the workers of the session acknowledged, when they are ahead"
+        for symbol, (record_id, complete) in self.work_queue.cursors().items():
+            if symbol not in self._cursor_value:
+                continue
+            if record_id > self._cursor_value[symbol]:
+                self.update_cursor(symbol, record_id)
+            if complete:
+                self.mark_complete(symbol)
 
-        if self._cursor_value["date"] < date.today():
-            self._cursor_value["date"] = date.today()
-            self._cursor_value = self.reset_cursor_value()
+    def plan(self) -> Iterable[Mapping[str, Any]]:
+        """
+        Slices and requests of each symbol for the plan command, the head of the tapes is not requested:
+        a tape is taken at the upper bound of the symbol's liquidity class, a symbol without one is expected to cost as usual in its cost profile
+        """
+        self.start_session()
+        symbols = self.skip_negative(self.schedule(self.parent.read_records(sync_mode=SyncMode.full_refresh)), lambda symbol: self.paging_url(symbol, 0, 1))
+        for record in symbols:
+            if record in self._complete:
+                yield {"ticker": record, "slices": 0, "requests": 0}
+                continue
+            pages = None
+            if record in self._liquidity:
+                remaining = 2 ** self._liquidity[record] - 1 - (self._cursor_value[record] + 1)
+                pages = max(0, -(-remaining // self.page_size))
+            elif self.cost_profile.estimate(record) is not None:
+                pages = max(0, round(self.cost_profile.estimate(record)[0]) - 1)
+            if pages is None:
+                yield {"ticker": record, "slices": None, "requests": None}
+            else:
+                slices = min(pages, 1) if self.page_workers > 1 else pages
+                yield {"ticker": record, "slices": slices, "requests": pages + 1}
+
+    def spool_file(self, symbol: str) -> Optional[SpoolFile]:
+        "Spool of the symbol for the current session, None when no `Spool directory` is set"
+        if self.spool_directory is None:
+            return None
+        session_date = self._cursor_value["date"]
+        if self._spool is None or self._spool.session_date != session_date:
+            if self._spool is not None:
+                self._spool.close()
+            self._spool = Spool(self.spool_directory, session_date)
+        return self._spool.file(symbol)
 
-        for record in super().read_records(*args, **kwargs):            
-            if self._cursor_value[record["ticker"]] < record["id"]:
-                self._cursor_value[record["ticker"]] = record["id"]
-                yield record
+    def spooled_ticks(self, stream_slice: Mapping[str, Any]) -> Optional[TickColumns]:
+        """
+        Trades of the page read back from the spool, when an earlier attempt of the session fetched all of its ids
+        Ids the spooled pages missed become holes, as in parse_response
+        """
+        ticker = stream_slice["symbol"]
+        spool_file = self.spool_file(ticker)
+        low, high = self.page_ids(stream_slice["head"], stream_slice["page"])
+        if spool_file is None or not spool_file.covers(low, high):
+            return None
+        ticks = spool_file.read(low, high)
+        if len(ticks) < high - low + 1:
+            received = set(ticks.ids)
+            self.add_holes(ticker, (record_id for record_id in range(max(low, self._cursor_value[ticker] + 1), high + 1) if record_id not in received))
+        return ticks
+
+    def page_ids(self, head: int, page: int) -> Tuple[int, int]:
+        "Lowest and highest id of a page in a snapshot of `head` trades, page 0 holds the newest trades"
+        return max(0, head - self.page_size * (page + 1)), head - self.page_size * page - 1
+
+    def parse_response(self, response: requests.Response, stream_slice: Mapping[str, Any] = None, decoded: Future = None, **kwargs) -> Iterable[Mapping]:
+        """
+        Emit the trades the page held in the snapshot pinned by stream_slice["head"], in ascending id
+        Ids count from the oldest trade of the session, so they are derived from the total of each response:
+        when trades arrived since the snapshot the page moved towards newer trades, the following pages are requested
+        until the trades of the snapshot page are all found
+        With a `Spool directory` the trades are spooled before they are emitted
+        Pages are decoded by page_run, `decoded` is the page_run of the response when read_pages started it in the `Decode workers`
+        """
+        ticker, page = stream_slice["symbol"], stream_slice["page"]
+        low, high = self.page_ids(stream_slice["head"], page)
+        cursor = self._cursor_value[ticker]
+        self.cost_profile.record(ticker, response)
+        self.budget.spend()
+        if self.work_queue is not None:
+            self.work_queue.heartbeat(ticker)
+        if not response.ok:
+            self.add_holes(ticker, range(max(low, cursor + 1), high + 1))
+            return
+
+        # Runs of consecutive ids found on each requested page, the page of the snapshot first then older ones
+        runs = []
+        found = 0
+        top = high
+        failed = False
+        if decoded is None:
+            decoded = self.decode_pool.decode(response, page_run, ticker, page, self.page_size, low, top, inline=True)
+        while True:
+            start, run, top, older = decoded.result()
+            if run:
+                runs.append((start, run))
+                found += len(run)
+            if not older:
+                break
+            page += 1
+            response = self.hedger.get(self.paging_url(ticker, page, self.page_size))
+            self.cost_profile.record(ticker, response)
+            self.budget.spend()
+            if not response.ok:
+                # The ids left in [low, top] become holes, the page is not spooled so that a later attempt requests it again
+                failed = True
+                break
+            decoded = self.decode_pool.decode(response, page_run, ticker, page, self.page_size, low, top, inline=True)
+
+        spool_file = self.spool_file(ticker)
+        if spool_file is not None and not failed:
+            ticks = TickColumns(ticker)
+            for start, run in reversed(runs):
+                ticks.extend(start, run)
+            spool_file.append(low, high, ticks)
+
+        if found < high - low + 1:
+            received = {start + offset for start, run in runs for offset in range(len(run))}
+            self.add_holes(ticker, (record_id for record_id in range(max(low, cursor + 1), high + 1) if record_id not in received))
+        for _, run in reversed(runs):
+            yield from run
+
+    def fetch_page(self, ticker: str, page: int, head: int) -> Tuple[requests.Response, Optional[Future]]:
+        "Request a page and start its page_run right away, so pages are decoded while the earlier ones are emitted"
+        response = self.hedger.get(self.paging_url(ticker, page, self.page_size))
+        if not response.ok:
+            return response, None
+        low, high = self.page_ids(head, page)
+        return response, self.decode_pool.decode(response, page_run, ticker, page, self.page_size, low, high)
+
+    def read_pages(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any]) -> Iterable[Mapping[str, Any]]:
+        """
+        Fetch the pages of a symbol with `Page workers` concurrent requests and release their records in ascending id
+        through a ReorderBuffer, pages parsed ahead of their turn are held as TickColumns
+        A page is handed to the `Decode workers` as soon as it arrived, see fetch_page
+        A page whose request failed is requested again with the usual retries, spooled pages are not requested
+        At most `Page workers` x 2 pages are requested ahead of the reader, a page is forgotten once it was parsed
+        """
+        ticker, head, pages = stream_slice["symbol"], stream_slice["head"], stream_slice["pages"]
+        with ThreadPoolExecutor(max_workers=self.page_workers) as executor, ReorderBuffer(self.reorder_buffer_size) as buffer:
+            queued = []
+            for position, page_num in enumerate(pages):
+                ticks = self.spooled_ticks({"symbol": ticker, "page": page_num, "head": head})
+                if ticks is None:
+                    queued.append(position)
+                else:
+                    buffer.push(position, ticks)
+            yield from buffer.ready()
+            queued = iter(queued)
+            in_flight = {}
+            for position in islice(queued, 2 * self.page_workers):
+                in_flight[executor.submit(self.fetch_page, ticker, pages[position], head)] = position
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                position = in_flight.pop(future)
+                following = next(queued, None)
+                if following is not None:
+                    in_flight[executor.submit(self.fetch_page, ticker, pages[following], head)] = following
+                page_slice = {"symbol": ticker, "page": pages[position], "head": head}
+                if future.exception() is None:
+                    response, decoded = future.result()
+                    records = self.parse_response(response, stream_slice=page_slice, decoded=decoded)
+                else:
+                    records = super().read_records(sync_mode=sync_mode, stream_slice=page_slice)
+                ticks = TickColumns(ticker)
+                for record in records:
+                    ticks.append(record["id"], record)
+                buffer.push(position, ticks)
+                yield from buffer.ready()
+
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        "Update symbol's cursor value with highest timestamp in corresponding symbol's record, records filling a hole are emitted as well"
+        if stream_slice.get("checkpoint"):
+            return
+
+        self.start_session()
+
+        if "pages" in stream_slice:
+            records = self.read_pages(sync_mode, stream_slice)
+        else:
+            ticks = self.spooled_ticks(stream_slice)
+            records = super().read_records(sync_mode=sync_mode, stream_slice=stream_slice, **kwargs) if ticks is None else ticks.records()
+        self._reading = True
+        try:
+            for record in self.until_circuit_opens(records, stream_slice):
+                if self._cursor_value[record["ticker"]] < record["id"]:
+                    self.update_cursor(record["ticker"], record["id"])
+                    yield record
+                elif record["id"] in self._holes.get(record["ticker"], ()):
+                    self.fill_hole(record["ticker"], record["id"])
+                    yield record
+        finally:
+            self._reading = False
         
 # Source
 class SourceTcbsIntraday(AbstractSource):
     def check_connection(self, logger, config) -> Tuple[bool, any]:
         "Test the connector, check for invalid arguments"
         try:
-            requests.get(config["Symbol URL"]).text.split(",")
+            SymbolUniverse(config).symbols(Hedger(config.get("Connect timeout", 10), config.get("Read timeout", 60)))
         except:
             return False, "Invalid URL or invalid file content format"
+        if not 0 <= config.get("Shard index", 0) < config.get("Shard count", 1):
+            return False, "Shard index must be between 0 and Shard count - 1"
         
         if config["Page size"] > 100:
             return False, "Page size must be smaller or equal to 100"
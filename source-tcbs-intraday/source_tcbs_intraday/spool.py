@@ -0,0 +1,134 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import mmap
+import os
+import pickle
+import shutil
+import struct
+import zlib
+from datetime import date
+from typing import List, MutableMapping, Tuple
+
+from .ticks import TickColumns
+
+# Lowest id, highest id of the fetched page, payload size, payload crc32
+HEADER = struct.Struct("<qqII")
+
+
+class SpoolFile:
+    """
+    Append-only file of the pages fetched for one symbol-day, read back through mmap
+    Each entry holds the id range a page covered in its snapshot and the pickled TickColumns of the trades found in it,
+    an entry torn by a crash is detected by its checksum and cut off when the file is opened again
+    """
+
+    def __init__(self, path: str, symbol: str):
+        self.path = path
+        self.symbol = symbol
+        self.entries: List[Tuple[int, int, int, int]] = []
+        self.file = open(path, "a+b")
+        self.map = None
+        self.load()
+
+    def load(self):
+        size = os.path.getsize(self.path)
+        if not size:
+            return
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = 0
+        while offset + HEADER.size <= size:
+            low, high, length, checksum = HEADER.unpack_from(self.map, offset)
+            start = offset + HEADER.size
+            if start + length > size or zlib.crc32(self.map[start : start + length]) != checksum:
+                break
+            self.entries.append((low, high, start, length))
+            offset = start + length
+        if offset < size:
+            self.map.close()
+            self.map = None
+            self.file.truncate(offset)
+
+    def append(self, low: int, high: int, ticks: TickColumns):
+        "Spool the trades of a page covering ids [low, high], the entry is on disk once this returns"
+        payload = pickle.dumps(ticks, protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self.file.seek(0, os.SEEK_END)
+        self.file.write(HEADER.pack(low, high, len(payload), zlib.crc32(payload)) + payload)
+        self.file.flush()
+        self.entries.append((low, high, offset + HEADER.size, len(payload)))
+
+    def covers(self, low: int, high: int) -> bool:
+        "Whether every id in [low, high] was part of a spooled page"
+        for entry_low, entry_high, _, _ in sorted(self.entries):
+            if entry_low > low:
+                return False
+            low = max(low, entry_high + 1)
+            if low > high:
+                return True
+        return False
+
+    def read(self, low: int, high: int) -> TickColumns:
+        "Spooled trades with an id in [low, high], a trade spooled twice is read from its latest entry"
+        found: MutableMapping[int, Tuple[TickColumns, int]] = {}
+        for entry_low, entry_high, start, length in self.entries:
+            if entry_low <= high and low <= entry_high:
+                ticks = self.payload(start, length)
+                for position, record_id in enumerate(ticks.ids):
+                    if low <= record_id <= high:
+                        found[record_id] = ticks, position
+        result = TickColumns(self.symbol)
+        for record_id in sorted(found):
+            ticks, position = found[record_id]
+            result.append(record_id, ticks.record(position))
+        return result
+
+    def payload(self, start: int, length: int) -> TickColumns:
+        if self.map is None or start + length > len(self.map):
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return pickle.loads(self.map[start : start + length])
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+class Spool:
+    """
+    Spool files of a session, one per symbol, under `directory`/<session date>/<symbol>.spool
+    A spool file is only kept open while its symbol is read, so a session of any number of symbols holds a few file descriptors
+    The spools of earlier sessions expire: they are removed when the spool of a newer session is opened
+    """
+
+    def __init__(self, directory: str, session_date: date):
+        for name in os.listdir(directory) if os.path.isdir(directory) else ():
+            if name < session_date.isoformat():
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        self.directory = os.path.join(directory, session_date.isoformat())
+        self.session_date = session_date
+        os.makedirs(self.directory, exist_ok=True)
+        self.files: MutableMapping[str, SpoolFile] = {}
+
+    def file(self, symbol: str) -> SpoolFile:
+        if symbol not in self.files:
+            self.files[symbol] = SpoolFile(os.path.join(self.directory, f"{symbol}.spool"), symbol)
+        return self.files[symbol]
+
+    def release(self, symbol: str):
+        "Close the spool of a symbol whose slices were read, it stays on disk and is opened again by file() when needed"
+        if symbol in self.files:
+            self.files.pop(symbol).close()
+
+    def discard(self, symbol: str):
+        "Remove the spool of a symbol whose tape is complete"
+        self.release(symbol)
+        path = os.path.join(self.directory, f"{symbol}.spool")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def close(self):
+        for spool_file in self.files.values():
+            spool_file.close()
+        self.files = {}
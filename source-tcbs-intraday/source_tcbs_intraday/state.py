@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+from typing import Any, Iterable, List, Mapping, MutableMapping
+
+STATE_VERSION = 2
+
+
+def encode_state(
+    cursor_value: Mapping[str, Any],
+    complete: Iterable[str] = (),
+    holes: Mapping[str, Iterable[int]] = None,
+    liquidity: Mapping[str, int] = None,
+    pending: Iterable[str] = (),
+) -> MutableMapping[str, Any]:
+    """
+    Group symbols sharing the same last ingested id, most symbols are still at -1 for a large part of the session
+    {"date": datetime.date(2023, 7, 3), "TCB": 10, "ABC": -1, "XYZ": -1} -> {"version": 2, "date": "2023-07-03", "cursors": {"10": "TCB", "-1": "ABC,XYZ"}, "complete": "", "holes": {}, "liquidity": {}, "pending": ""}
+    `complete` lists the symbols whose whole tape of the session was read after the close
+    `holes` holds the ids below the cursor that were not ingested, only for symbols having some
+    `liquidity` holds the size class of the last known tape of each symbol, grouped like the cursors: {"TCB": 15, "ABC": 15} -> {"15": "TCB,ABC"}
+    `pending` lists the symbols a run left when its budget was spent, in the order they are read first next run
+    """
+    return {
+        "version": STATE_VERSION,
+        "date": cursor_value["date"].isoformat(),
+        "cursors": encode_groups({symbol: cursor for symbol, cursor in cursor_value.items() if symbol != "date"}),
+        "complete": ",".join(sorted(complete)),
+        "holes": {symbol: encode_ids(ids) for symbol, ids in (holes or {}).items() if ids},
+        "liquidity": encode_groups(liquidity or {}),
+        "pending": ",".join(pending),
+    }
+
+
+def decode_state(value: Mapping[str, Any]) -> MutableMapping[str, Any]:
+    """
+    Read both the grouped state and the legacy one symbol per key state
+    {"version": 2, "date": "2023-07-03", "cursors": {"10": "TCB"}} -> {"date": "2023-07-03", "TCB": 10}
+    {"date": "2023-07-03", "TCB": 10} -> {"date": "2023-07-03", "TCB": 10}
+    """
+    version = value.get("version")
+    if version is None:
+        return dict(value)
+    if version != STATE_VERSION:
+        raise ValueError(f"Unsupported state version: {version}")
+
+    return {"date": value["date"], **decode_groups(value["cursors"])}
+
+
+def decode_complete(value: Mapping[str, Any]) -> List[str]:
+    "Symbols whose session tape is complete, the legacy state does not track them"
+    complete = value.get("complete", "") if value.get("version") is not None else ""
+    return complete.split(",") if complete else []
+
+
+def decode_holes(value: Mapping[str, Any]) -> MutableMapping[str, set]:
+    "Ids missing below the cursor of each symbol, the legacy state does not track them"
+    holes = value.get("holes", {}) if value.get("version") is not None else {}
+    return {symbol: decode_ids(ids) for symbol, ids in holes.items()}
+
+
+def decode_pending(value: Mapping[str, Any]) -> List[str]:
+    "Symbols left by the last run, the legacy state does not track them"
+    pending = value.get("pending", "") if value.get("version") is not None else ""
+    return pending.split(",") if pending else []
+
+
+def decode_liquidity(value: Mapping[str, Any]) -> MutableMapping[str, int]:
+    "Size class of the last known tape of each symbol, the legacy state does not track it"
+    return decode_groups(value.get("liquidity", {})) if value.get("version") is not None else {}
+
+
+def encode_groups(values: Mapping[str, int]) -> Mapping[str, str]:
+    "{'TCB': 10, 'ABC': -1, 'XYZ': -1} -> {'10': 'TCB', '-1': 'ABC,XYZ'}"
+    groups = {}
+    for symbol, value in values.items():
+        groups.setdefault(str(value), []).append(symbol)
+    return {value: ",".join(symbols) for value, symbols in groups.items()}
+
+
+def decode_groups(value: Mapping[str, str]) -> MutableMapping[str, int]:
+    "{'10': 'TCB', '-1': 'ABC,XYZ'} -> {'TCB': 10, 'ABC': -1, 'XYZ': -1}"
+    return {symbol: int(group) for group, symbols in value.items() for symbol in symbols.split(",")}
+
+
+def encode_ids(ids: Iterable[int]) -> str:
+    "{40, 41, 42, 70} -> '40:42,70'"
+    ranges = []
+    for record_id in sorted(ids):
+        if ranges and ranges[-1][1] == record_id - 1:
+            ranges[-1][1] = record_id
+        else:
+            ranges.append([record_id, record_id])
+    return ",".join(str(low) if low == high else f"{low}:{high}" for low, high in ranges)
+
+
+def decode_ids(value: str) -> set:
+    "'40:42,70' -> {40, 41, 42, 70}"
+    ids = set()
+    for id_range in filter(None, value.split(",")):
+        low, _, high = id_range.partition(":")
+        ids.update(range(int(low), int(high or low) + 1))
+    return ids
@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+from array import array
+from typing import Any, Iterable, Iterator, List, Mapping, MutableMapping
+
+# Array typecode of each field of schemas/stock_intraday.json, strings are stored as indexes in a table of distinct values
+FIELDS = {"p": "d", "v": "q", "cp": "d", "rcp": "d", "a": "str", "ba": "d", "sa": "d", "hl": "b", "pcp": "d", "t": "str"}
+PYTHON_TYPES = {"d": (int, float), "q": (int,), "b": (bool,), "str": (str,)}
+
+
+class TickColumns:
+    """
+    Ticks of one symbol-day held as one column buffer per field instead of one dict per tick
+    A tick costs about 70 bytes instead of the ~1 KB of its dict, ticks are converted back to dicts only when emitted
+    Values that do not fit their column (missing, null, unexpected type, unknown field) are kept aside per tick, so the conversion is lossless
+    """
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.ids = array("q")
+        self.columns = {field: array("I" if typecode == "str" else typecode) for field, typecode in FIELDS.items()}
+        self.strings: List[str] = []
+        self.string_index: MutableMapping[str, int] = {}
+        self.extras: MutableMapping[int, MutableMapping[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, record_id: int, record: Mapping[str, Any]):
+        position = len(self.ids)
+        self.ids.append(record_id)
+        extra = {field: value for field, value in record.items() if field not in FIELDS and field not in ("ticker", "id")}
+        for field, typecode in FIELDS.items():
+            value = record.get(field)
+            # bool is an int, so it is only accepted by the boolean column
+            if type(value) not in PYTHON_TYPES[typecode] or (typecode != "b" and isinstance(value, bool)):
+                extra[field] = value if field in record else _MISSING
+                value = 0
+            elif typecode == "str":
+                value = self.string_index.setdefault(value, len(self.strings))
+                if value == len(self.strings):
+                    self.strings.append(record[field])
+            self.columns[field].append(value)
+        if extra:
+            self.extras[position] = extra
+
+    def extend(self, first_id: int, records: Iterable[Mapping[str, Any]]):
+        "Append ticks with consecutive ids starting at `first_id`"
+        for record_id, record in enumerate(records, first_id):
+            self.append(record_id, record)
+
+    def record(self, position: int) -> MutableMapping[str, Any]:
+        "Tick at `position` as the dict emitted by the stream"
+        record = {}
+        extra = self.extras.get(position, {})
+        for field, typecode in FIELDS.items():
+            if field in extra:
+                value = extra[field]
+                if value is not _MISSING:
+                    record[field] = value
+                continue
+            value = self.columns[field][position]
+            if typecode == "str":
+                value = self.strings[value]
+            elif typecode == "b":
+                value = bool(value)
+            elif typecode == "d" and value.is_integer():
+                # The API sends whole prices as integers
+                value = int(value)
+            record[field] = value
+        for field, value in extra.items():
+            if field not in FIELDS:
+                record[field] = value
+        record["ticker"] = self.ticker
+        record["id"] = self.ids[position]
+        return record
+
+    def records(self, start: int = 0, stop: int = None) -> Iterator[MutableMapping[str, Any]]:
+        for position in range(start, len(self.ids) if stop is None else stop):
+            yield self.record(position)
+
+    def clear(self):
+        self.__init__(self.ticker)
+
+    @property
+    def nbytes(self) -> int:
+        "Size of the column buffers"
+        return sum(column.itemsize * len(column) for column in (self.ids, *self.columns.values()))
+
+
+class _Missing:
+    "Marks a field absent from the tick, as opposed to a field holding null"
+
+    def __repr__(self):
+        return "<missing>"
+
+    def __reduce__(self):
+        # Unpickled spilled ticks must still hold the module's sentinel
+        return "_MISSING"
+
+
+_MISSING = _Missing()
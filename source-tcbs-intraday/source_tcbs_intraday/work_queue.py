@@ -0,0 +1,138 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, Mapping, Optional
+
+
+class WorkQueue:
+    """
+    Symbols of a run shared by several connector processes through a SQLite database in WAL mode, e.g. on a shared volume
+    Every worker seeds the run with its planned symbols, the symbols missing from the queue are appended in that order,
+    then each worker leases one symbol at a time until none is left
+    A lease is renewed by heartbeats while the symbol is read, the symbol of a worker that died is leased again once its lease expired
+    A read symbol is acknowledged with its cursor, so each worker can merge the cursors of the others into its state
+    Runs are named so that they sort by age, e.g. by date: the queue of earlier runs is dropped when a newer run starts
+    A run can be read again, e.g. a live session by each of its runs: once all its items were read, the next start is a new generation
+    """
+
+    def __init__(self, path: str, stream: str, lease: float = 300):
+        self.stream = stream
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.run = None
+        self.renewed = {}
+        self.lock = threading.Lock()
+        # Autocommit, transactions are opened explicitly where a read and a write must be atomic
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS items (stream TEXT, run TEXT, item TEXT, priority INTEGER, owner TEXT, expires REAL, "
+            "done INTEGER NOT NULL DEFAULT 0, cursor TEXT, PRIMARY KEY (stream, run, item))"
+        )
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        "Write transaction taken up front, so two workers never lease the same item"
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def execute(self, sql: str, parameters: Iterable[Any] = ()) -> List[tuple]:
+        with self.lock:
+            return self.connection.execute(sql, tuple(parameters)).fetchall()
+
+    def start(self, run: str, rerun: bool = False):
+        """
+        Start or join the run, with `rerun` the generations of the run are named `run`.000000, `run`.000001 ...:
+        a worker joins the latest one while some of its items are left to read, and starts the next one once all were read
+        """
+        if rerun:
+            rows = self.execute(
+                "SELECT run, MIN(done) FROM items WHERE stream = ? AND run > ? AND run < ? GROUP BY run ORDER BY run DESC LIMIT 1",
+                (self.stream, f"{run}.", f"{run}/"),
+            )
+            generation = int(rows[0][0].rpartition(".")[2]) + rows[0][1] if rows else 0
+            run = f"{run}.{generation:06d}"
+        self.run = run
+        self.execute("DELETE FROM items WHERE stream = ? AND run < ?", (self.stream, run))
+
+    def seed(self, items: Iterable[str]):
+        with self.transaction() as connection:
+            (count,) = connection.execute("SELECT COUNT(*) FROM items WHERE stream = ? AND run = ?", (self.stream, self.run)).fetchone()
+            connection.executemany(
+                "INSERT OR IGNORE INTO items (stream, run, item, priority) VALUES (?, ?, ?, ?)",
+                ((self.stream, self.run, item, priority) for priority, item in enumerate(items, count)),
+            )
+
+    def lease_next(self) -> Optional[str]:
+        "Lease the first item that is neither read nor leased, None once the run is drained"
+        now = time.time()
+        with self.transaction() as connection:
+            row = connection.execute(
+                "SELECT item FROM items WHERE stream = ? AND run = ? AND done = 0 AND (expires IS NULL OR expires < ?) ORDER BY priority LIMIT 1",
+                (self.stream, self.run, now),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE items SET owner = ?, expires = ? WHERE stream = ? AND run = ? AND item = ?",
+                (self.owner, now + self.lease, self.stream, self.run, row[0]),
+            )
+        self.renewed[row[0]] = now
+        return row[0]
+
+    def claim(self) -> Iterator[str]:
+        "Items leased one after the other, each one should be acknowledged or released before the next is asked for"
+        while True:
+            item = self.lease_next()
+            if item is None:
+                return
+            yield item
+
+    def heartbeat(self, item: str):
+        "Renew the lease of an item being read, the database is written at most every third of the lease"
+        now = time.time()
+        if now - self.renewed.get(item, 0) < self.lease / 3:
+            return
+        self.renewed[item] = now
+        self.execute(
+            "UPDATE items SET expires = ? WHERE stream = ? AND run = ? AND item = ? AND owner = ? AND done = 0",
+            (now + self.lease, self.stream, self.run, item, self.owner),
+        )
+
+    def ack(self, item: str, cursor: Any):
+        "Mark the item read, with the cursor it reached"
+        self.renewed.pop(item, None)
+        self.execute(
+            "UPDATE items SET done = 1, owner = ?, expires = NULL, cursor = ? WHERE stream = ? AND run = ? AND item = ?",
+            (self.owner, json.dumps(cursor), self.stream, self.run, item),
+        )
+
+    def release(self, item: str):
+        "Give up the lease of an item that was not read, another worker can lease it right away"
+        self.renewed.pop(item, None)
+        self.execute(
+            "UPDATE items SET owner = NULL, expires = NULL WHERE stream = ? AND run = ? AND item = ? AND owner = ? AND done = 0",
+            (self.stream, self.run, item, self.owner),
+        )
+
+    def cursors(self) -> Mapping[str, Any]:
+        "Cursors of the items of the run acknowledged by any worker"
+        rows = self.execute("SELECT item, cursor FROM items WHERE stream = ? AND run = ? AND done = 1", (self.stream, self.run))
+        return {item: json.loads(cursor) for item, cursor in rows}
+
+    def close(self):
+        self.connection.close()
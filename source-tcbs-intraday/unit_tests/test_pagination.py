@@ -0,0 +1,239 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import requests
+from airbyte_cdk.models import AirbyteStream, ConfiguredAirbyteCatalog, ConfiguredAirbyteStream, DestinationSyncMode, SyncMode, Type
+from pytest import fixture
+from requests.adapters import HTTPAdapter
+from source_tcbs_intraday import state
+from source_tcbs_intraday.source import SourceTcbsIntraday, StockIntraday, Symbol
+from source_tcbs_intraday.trading_calendar import TradingCalendar
+from urllib3 import HTTPResponse
+
+
+def page(tape, page_num, size=10):
+    "Page of a tape as served by the API, newest trade first"
+    newest_first = list(reversed(tape))
+    return {"page": page_num, "size": size, "total": len(tape), "ticker": "TCB", "data": newest_first[page_num * size : (page_num + 1) * size]}
+
+
+@fixture
+def stock_intraday(mocker):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC"))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Page size": 10}
+    return StockIntraday(parent=Symbol(config=config), config=config)
+
+
+def test_page_list_and_ids(stock_intraday):
+    assert stock_intraday.get_page_list(25) == [2, 1, 0]
+    assert stock_intraday.get_page_list(20) == [1, 0]
+    assert stock_intraday.get_page_list(0) == []
+    assert stock_intraday.page_ids(25, 2) == (0, 4)
+    assert stock_intraday.page_ids(25, 0) == (15, 24)
+
+
+def test_parse_response_follows_trades_arrived_after_the_snapshot(stock_intraday, mocker):
+    tape = [{"v": trade_id} for trade_id in range(33)]
+    # The snapshot held 25 trades, 8 more arrived before page 1 was requested
+    response = MagicMock(ok=True)
+    response.json.return_value = page(tape, 1)
+    mocker.patch("requests.Session.get", return_value=MagicMock(json=MagicMock(return_value=page(tape, 2))))
+
+    records = list(stock_intraday.parse_response(response, stream_slice={"symbol": "TCB", "page": 1, "head": 25}))
+    assert [record["id"] for record in records] == list(range(5, 15))
+    assert all(record["id"] == record["v"] for record in records)
+
+
+def test_parse_response_gives_identical_ticks_distinct_ids(stock_intraday):
+    tape = [{"p": 27000, "v": 100} for _ in range(10)]
+    response = MagicMock(ok=True)
+    response.json.return_value = page(tape, 0)
+
+    records = list(stock_intraday.parse_response(response, stream_slice={"symbol": "TCB", "page": 0, "head": 10}))
+    assert [record["id"] for record in records] == list(range(10))
+    assert stock_intraday._holes == {}
+
+
+def test_parse_response_records_missing_ids_as_holes(stock_intraday, mocker):
+    tape = [{"v": trade_id} for trade_id in range(10)]
+    # The page came back short and the following page is empty
+    response = MagicMock(ok=True)
+    response.json.return_value = dict(page(tape, 0), data=list(reversed(tape))[:7])
+    mocker.patch("requests.Session.get", return_value=MagicMock(json=MagicMock(return_value=dict(page(tape, 1), data=[]))))
+
+    records = list(stock_intraday.parse_response(response, stream_slice={"symbol": "TCB", "page": 0, "head": 10}))
+    assert [record["id"] for record in records] == list(range(3, 10))
+    assert stock_intraday._holes == {"TCB": {0, 1, 2}}
+
+
+def test_failed_follow_up_page_leaves_the_rest_of_the_page_as_holes(stock_intraday, mocker):
+    tape = [{"v": trade_id} for trade_id in range(33)]
+    # 8 trades arrived after the snapshot of 25, the older page holding ids 5 to 12 answers a 502
+    response = MagicMock(ok=True)
+    response.json.return_value = page(tape, 1)
+    mocker.patch("requests.Session.get", return_value=MagicMock(ok=False, status_code=502))
+
+    records = list(stock_intraday.parse_response(response, stream_slice={"symbol": "TCB", "page": 1, "head": 25}))
+    assert [record["id"] for record in records] == [13, 14]
+    assert stock_intraday._holes == {"TCB": set(range(5, 13))}
+
+def test_concurrent_pages_are_emitted_in_ascending_id(mocker):
+    tape = [{"v": trade_id} for trade_id in range(45)]
+
+    def get(url, *args, **kwargs):
+        if "paging" not in url:
+            return MagicMock(text="TCB")
+        page_num, size = (int(parameter.split("=")[1]) for parameter in url.split("?")[1].split("&")[:2])
+        # Older pages come back last
+        time.sleep(0.001 * (5 - page_num))
+        return MagicMock(ok=True, json=MagicMock(return_value=page(tape, page_num, size)))
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Page size": 10, "Page workers": 4, "Reorder buffer size": 10}
+    stock_intraday = StockIntraday(parent=Symbol(config=config), config=config)
+    stock_intraday.parent.read_records = MagicMock(return_value=iter(["TCB"]))
+
+    stream_slice = next(iter(stock_intraday.stream_slices()))
+    assert stream_slice == {"symbol": "TCB", "pages": [4, 3, 2, 1, 0], "head": 45}
+    records = list(stock_intraday.read_records(sync_mode=SyncMode.incremental, stream_slice=stream_slice))
+    assert [record["id"] for record in records] == list(range(45))
+    assert [record["v"] for record in records] == list(range(45))
+
+
+def test_pages_requested_ahead_of_the_reader_are_bounded(mocker):
+    tape = [{"v": trade_id} for trade_id in range(100)]
+
+    def get(url, *args, **kwargs):
+        if "paging" not in url:
+            return MagicMock(text="TCB")
+        page_num, size = (int(parameter.split("=")[1]) for parameter in url.split("?")[1].split("&")[:2])
+        # The oldest page, read first, comes back first
+        time.sleep(0 if page_num == 9 else 0.01)
+        return MagicMock(ok=True, json=MagicMock(return_value=page(tape, page_num, size)))
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Page size": 10, "Page workers": 2}
+    stock_intraday = StockIntraday(parent=Symbol(config=config), config=config)
+    submit = mocker.spy(ThreadPoolExecutor, "submit")
+
+    records = stock_intraday.read_records(sync_mode=SyncMode.incremental, stream_slice={"symbol": "TCB", "pages": list(range(9, -1, -1)), "head": 100})
+    next(records)
+    # The first page read frees a place for a fifth one
+    assert submit.call_count == 5
+    assert [record["id"] for record in records] == list(range(1, 100))
+    assert submit.call_count == 10
+
+
+def test_state_is_encoded_once_per_slice(stock_intraday, mocker):
+    tape = [{"v": trade_id} for trade_id in range(10)]
+    mocker.patch("requests.Session.get", return_value=MagicMock(ok=True, json=MagicMock(return_value=page(tape, 0))))
+    encode_state = mocker.patch("source_tcbs_intraday.source.encode_state", wraps=state.encode_state)
+    stock_intraday.state = {}
+    stock_intraday.state
+
+    # Airbyte reads the state after every record as well as after the slice
+    for _ in stock_intraday.read_records(sync_mode=SyncMode.incremental, stream_slice={"symbol": "TCB", "pages": [0], "head": 10}):
+        stock_intraday.state
+    assert encode_state.call_count == 1
+    assert stock_intraday.state["cursors"] == {"9": "TCB", "-1": "ABC"}
+    assert encode_state.call_count == 2
+
+
+def test_symbols_are_read_from_the_most_liquid(stock_intraday):
+    stock_intraday.update_liquidity("TCB", 40000, session_closed=True)
+    stock_intraday.update_liquidity("ABC", 900, session_closed=True)
+    # A quiet morning does not lower the liquidity of the previous session
+    stock_intraday.update_liquidity("TCB", 300, session_closed=False)
+
+    assert stock_intraday.by_liquidity(["ABC", "TCB", "NEW"]) == ["NEW", "TCB", "ABC"]
+    assert stock_intraday.state["liquidity"] == {"16": "TCB", "10": "ABC"}
+
+
+def test_symbols_left_by_a_spent_budget_come_first(stock_intraday):
+    stock_intraday.update_liquidity("TCB", 40000, session_closed=True)
+    stock_intraday.update_liquidity("ABC", 900, session_closed=True)
+    stock_intraday.set_pending(["ABC"])
+
+    assert stock_intraday.schedule(["TCB", "ABC", "NEW"]) == ["ABC", "NEW", "TCB"]
+    assert stock_intraday.state["pending"] == "ABC"
+
+
+def test_empty_state_of_a_first_sync_starts_at_the_session(stock_intraday):
+    stock_intraday.state = {}
+
+    assert stock_intraday.state["date"] == stock_intraday.calendar.session_date().isoformat()
+    assert stock_intraday.state["cursors"] == {"-1": "TCB,ABC"}
+
+
+def test_reconciliation_requests_the_pages_of_holes_again(mocker, caplog):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC"))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Page size": 10, "Reconciliation": True}
+    stock_intraday = StockIntraday(parent=Symbol(config=config), config=config)
+    stock_intraday.parent.read_records = MagicMock(side_effect=lambda **kwargs: iter(["TCB", "ABC"]))
+    stock_intraday.calendar.is_session_closed = MagicMock(return_value=True)
+    stock_intraday.get_head = MagicMock(return_value=30)
+    stock_intraday.update_cursor("TCB", 29)
+    stock_intraday.update_cursor("ABC", 29)
+    stock_intraday.add_holes("TCB", [3, 4, 25])
+
+    assert list(stock_intraday.stream_slices()) == [{"symbol": "TCB", "page": 2, "head": 30}, {"symbol": "TCB", "page": 0, "head": 30}, {"checkpoint": True}]
+    assert stock_intraday._complete == {"ABC"}
+    assert "Reconciliation could not complete the tape of 1 symbols: TCB" in caplog.text
+
+    for record_id in (3, 4, 25):
+        stock_intraday.fill_hole("TCB", record_id)
+    assert list(stock_intraday.stream_slices()) == [{"checkpoint": True}]
+    assert stock_intraday._complete == {"ABC", "TCB"}
+
+
+def test_state_set_after_the_last_symbol_reaches_the_emitted_state(mocker):
+    tape = [{"p": 27000, "v": trade_id} for trade_id in range(5)]
+
+    def get(url, **kwargs):
+        return MagicMock(text="TCB,ABC") if url.endswith("symbol.txt") else MagicMock(status_code=200, json=MagicMock(return_value=page(tape, 0)))
+
+    def send(request, **kwargs):
+        response = requests.Response()
+        response.status_code, response._content, response.url, response.request = 200, json.dumps(page(tape, 0)).encode(), request.url, request
+        response.raw = HTTPResponse(status=200, request_url=request.url)
+        return response
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    mocker.patch.object(HTTPAdapter, "send", side_effect=send)
+    mocker.patch.object(TradingCalendar, "is_session_closed", return_value=True)
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Page size": 10, "Request budget": 2}
+    catalog = ConfiguredAirbyteCatalog(
+        streams=[
+            ConfiguredAirbyteStream(
+                stream=AirbyteStream(name="stock_intraday", json_schema={}, supported_sync_modes=[SyncMode.incremental]),
+                sync_mode=SyncMode.incremental,
+                destination_sync_mode=DestinationSyncMode.append,
+            )
+        ]
+    )
+
+    messages = list(SourceTcbsIntraday().read(logging.getLogger("airbyte"), config, catalog))
+    state = [message.state.stream.stream_state.dict() for message in messages if message.type == Type.STATE][-1]
+    # TCB was read whole after the close, the budget was spent before ABC
+    assert state["complete"] == "TCB"
+    assert state["pending"] == "ABC"
+
+
+def test_head_the_api_failed_to_answer_is_counted_by_the_circuit(mocker):
+    html = MagicMock(ok=True, status_code=200, json=MagicMock(side_effect=requests.exceptions.JSONDecodeError("Expecting value", "<html>", 0)))
+    failed = MagicMock(ok=False, status_code=502, raise_for_status=MagicMock(side_effect=requests.HTTPError))
+    mocker.patch("requests.Session.get", side_effect=[MagicMock(text="TCB,ABC", status_code=200), failed, html])
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Page size": 10, "Circuit failures": 2}
+    stock_intraday = StockIntraday(parent=Symbol(config=config), config=config)
+    stock_intraday.parent.read_records = MagicMock(side_effect=lambda **kwargs: iter(["TCB", "ABC"]))
+
+    # The 502 and the HTML answer open the circuit, both symbols are read first next run
+    assert list(stock_intraday.stream_slices()) == [{"checkpoint": True}]
+    assert stock_intraday.circuit.paused
+    assert stock_intraday.state["pending"] == "TCB,ABC"
@@ -0,0 +1,28 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from source_tcbs_intraday.reorder import ReorderBuffer
+from source_tcbs_intraday.ticks import TickColumns
+
+
+def page(first_id, size=10):
+    ticks = TickColumns("TCB")
+    ticks.extend(first_id, ({"p": 27000, "v": record_id} for record_id in range(first_id, first_id + size)))
+    return ticks
+
+
+def test_reorder_buffer_releases_pages_in_order_and_spills_beyond_its_bound():
+    released = []
+    with ReorderBuffer(max_ticks=15) as buffer:
+        for position in (3, 1, 2, 0, 4):
+            buffer.push(position, page(position * 10))
+            released += [record["id"] for record in buffer.ready()]
+            if position == 2:
+                # Page 3 is held, pages 1 and 2 went over the bound
+                assert list(buffer.pages) == [3]
+                assert sorted(buffer.spilled) == [1, 2]
+                assert released == []
+
+    assert released == list(range(50))
+    assert buffer.held == 0 and not buffer.spilled
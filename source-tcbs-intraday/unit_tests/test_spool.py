@@ -0,0 +1,57 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import os
+from datetime import date
+
+from source_tcbs_intraday.spool import Spool
+from source_tcbs_intraday.ticks import TickColumns
+
+
+def ticks(ids):
+    columns = TickColumns("TCB")
+    for record_id in ids:
+        columns.append(record_id, {"p": 27000, "v": record_id})
+    return columns
+
+
+def test_spool_is_read_back_after_a_crash(tmp_path):
+    spool = Spool(str(tmp_path), date(2023, 7, 3))
+    spool_file = spool.file("TCB")
+    spool_file.append(10, 19, ticks(range(10, 20)))
+    spool_file.append(0, 9, ticks([0, 1, 2, 5, 6, 7, 8, 9]))
+    spool_file.append(20, 29, ticks(range(20, 30)))
+    # The last entry was torn by the crash
+    with open(spool_file.path, "r+b") as file:
+        file.truncate(os.path.getsize(spool_file.path) - 5)
+    spool.close()
+
+    spool_file = Spool(str(tmp_path), date(2023, 7, 3)).file("TCB")
+    assert spool_file.covers(0, 19) and spool_file.covers(4, 15)
+    assert not spool_file.covers(15, 24)
+    assert list(spool_file.read(0, 12).ids) == [0, 1, 2, 5, 6, 7, 8, 9, 10, 11, 12]
+    assert [record["v"] for record in spool_file.read(8, 11).records()] == [8, 9, 10, 11]
+
+    spool_file.append(20, 29, ticks(range(20, 30)))
+    assert spool_file.covers(15, 29)
+    assert list(spool_file.read(18, 21).ids) == [18, 19, 20, 21]
+
+
+def test_spools_of_earlier_sessions_expire(tmp_path):
+    Spool(str(tmp_path), date(2023, 7, 3)).file("TCB").append(0, 0, ticks([0]))
+    spool = Spool(str(tmp_path), date(2023, 7, 4))
+
+    assert os.listdir(tmp_path) == ["2023-07-04"]
+    assert not spool.file("TCB").covers(0, 0)
+
+
+def test_released_spool_is_opened_again_on_demand(tmp_path):
+    spool = Spool(str(tmp_path), date(2023, 7, 3))
+    for symbol in ("TCB", "ABC"):
+        spool.file(symbol).append(0, 9, ticks(range(10)))
+        spool.release(symbol)
+    assert spool.files == {}
+
+    assert spool.file("TCB").covers(0, 9)
+    assert list(spool.file("ABC").read(3, 5).ids) == [3, 4, 5]
@@ -0,0 +1,51 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from datetime import date
+
+import pytest
+from source_tcbs_intraday.state import decode_complete, decode_holes, decode_liquidity, decode_state, encode_state
+
+
+def test_encode_state_groups_symbols_by_cursor():
+    cursor_value = {"date": date(2023, 7, 3), "TCB": 10, "ABC": -1, "XYZ": -1}
+    expected_state = {"version": 2, "date": "2023-07-03", "cursors": {"10": "TCB", "-1": "ABC,XYZ"}, "complete": "", "holes": {}, "liquidity": {}, "pending": ""}
+    assert encode_state(cursor_value) == expected_state
+
+
+def test_decode_state_round_trip():
+    cursor_value = {"date": date(2023, 7, 3), "TCB": 10, "ABC": -1}
+    assert decode_state(encode_state(cursor_value)) == {"date": "2023-07-03", "TCB": 10, "ABC": -1}
+
+
+def test_decode_legacy_state():
+    legacy_state = {"date": "2023-07-03", "TCB": 10}
+    assert decode_state(legacy_state) == legacy_state
+
+
+def test_decode_unknown_version():
+    with pytest.raises(ValueError):
+        decode_state({"version": 99, "date": "2023-07-03", "cursors": {}})
+
+
+def test_decode_complete():
+    cursor_value = {"date": date(2023, 7, 3), "TCB": 10, "ABC": 20}
+    assert decode_complete(encode_state(cursor_value, {"TCB", "ABC"})) == ["ABC", "TCB"]
+    assert decode_complete(encode_state(cursor_value)) == []
+    assert decode_complete({"date": "2023-07-03", "TCB": 10}) == []
+
+
+def test_encode_decode_holes():
+    cursor_value = {"date": date(2023, 7, 3), "TCB": 100, "ABC": 20}
+    state = encode_state(cursor_value, holes={"TCB": {40, 41, 42, 70}, "ABC": set()})
+    assert state["holes"] == {"TCB": "40:42,70"}
+    assert decode_holes(state) == {"TCB": {40, 41, 42, 70}}
+
+
+def test_encode_decode_liquidity():
+    cursor_value = {"date": date(2023, 7, 3), "TCB": 100, "ABC": 20, "XYZ": -1}
+    state = encode_state(cursor_value, liquidity={"TCB": 15, "ABC": 15, "XYZ": 3})
+    assert state["liquidity"] == {"15": "TCB,ABC", "3": "XYZ"}
+    assert decode_liquidity(state) == {"TCB": 15, "ABC": 15, "XYZ": 3}
+    assert decode_liquidity({"date": "2023-07-03", "TCB": 10}) == {}
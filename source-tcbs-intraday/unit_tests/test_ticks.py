@@ -0,0 +1,27 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from source_tcbs_intraday.ticks import TickColumns
+
+
+def test_ticks_round_trip_to_the_emitted_dicts():
+    ticks = [
+        {"p": 27000, "v": 100, "cp": -0.5, "rcp": 0, "a": "BU", "ba": 0, "sa": 100, "hl": True, "pcp": 27050, "t": "09:15:01"},
+        {"p": 27000, "v": 100, "cp": -0.5, "rcp": 0, "a": "BU", "ba": 0, "sa": 100, "hl": True, "pcp": 27050, "t": "09:15:01"},
+        {"p": 27050.5, "v": 200, "cp": 0, "rcp": 0, "a": "SD", "ba": 10, "sa": 0, "hl": False, "pcp": 27000, "t": "09:15:02"},
+    ]
+    columns = TickColumns("TCB")
+    columns.extend(40, ticks)
+
+    assert len(columns) == 3
+    assert list(columns.records()) == [dict(tick, ticker="TCB", id=40 + offset) for offset, tick in enumerate(ticks)]
+    assert columns.strings == ["BU", "09:15:01", "SD", "09:15:02"]
+
+
+def test_ticks_keep_values_that_do_not_fit_their_column():
+    tick = {"p": None, "v": 1.5, "a": "BU", "hl": 1, "new": "field"}
+    columns = TickColumns("TCB")
+    columns.append(0, tick)
+
+    assert columns.record(0) == dict(tick, ticker="TCB", id=0)
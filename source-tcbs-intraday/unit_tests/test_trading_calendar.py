@@ -0,0 +1,38 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from datetime import date, datetime
+
+from source_tcbs_intraday.trading_calendar import MARKET_TIMEZONE, TradingCalendar
+
+# 2023-04-28 is a Friday, 2023-05-01 and 2023-05-02 are holidays
+calendar = TradingCalendar(["2023-05-01", "2023-05-02"])
+
+
+def test_is_trading_day():
+    assert calendar.is_trading_day(date(2023, 4, 28))
+    assert not calendar.is_trading_day(date(2023, 4, 29))
+    assert not calendar.is_trading_day(date(2023, 5, 1))
+
+
+def test_previous_trading_day_skips_weekend_and_holidays():
+    assert calendar.previous_trading_day(date(2023, 5, 3)) == date(2023, 4, 28)
+
+
+def test_session_date_and_last_closed_session():
+    before_open = datetime(2023, 5, 3, 8, 0, tzinfo=MARKET_TIMEZONE)
+    in_session = datetime(2023, 5, 3, 10, 0, tzinfo=MARKET_TIMEZONE)
+    after_close = datetime(2023, 5, 3, 16, 0, tzinfo=MARKET_TIMEZONE)
+
+    assert calendar.session_date(before_open) == date(2023, 4, 28)
+    assert calendar.session_date(in_session) == date(2023, 5, 3)
+    assert calendar.last_closed_session(in_session) == date(2023, 4, 28)
+    assert calendar.last_closed_session(after_close) == date(2023, 5, 3)
+    assert calendar.is_session_closed(before_open)
+    assert not calendar.is_session_closed(in_session)
+    assert calendar.is_session_closed(after_close)
+
+
+def test_trading_days():
+    assert list(calendar.trading_days(date(2023, 4, 27), date(2023, 5, 3))) == [date(2023, 4, 27), date(2023, 4, 28), date(2023, 5, 3)]
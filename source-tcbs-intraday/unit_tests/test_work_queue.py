@@ -0,0 +1,47 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from unittest.mock import MagicMock
+
+from source_tcbs_intraday.source import StockIntraday, Symbol
+from source_tcbs_intraday.work_queue import WorkQueue
+
+
+def test_drained_run_is_read_again_as_a_new_generation(tmp_path):
+    path = str(tmp_path / "queue.db")
+    first, second = WorkQueue(path, "stock_intraday"), WorkQueue(path, "stock_intraday")
+    first.start("2023-07-03", rerun=True)
+    first.seed(["TCB", "ABC"])
+    assert first.lease_next() == "TCB"
+
+    # A worker starting while items are left joins the run
+    second.start("2023-07-03", rerun=True)
+    assert second.run == first.run == "2023-07-03.000000"
+    assert list(second.claim()) == ["ABC"]
+    first.ack("TCB", 10)
+    second.ack("ABC", 20)
+
+    first.start("2023-07-03", rerun=True)
+    assert first.run == "2023-07-03.000001"
+    first.seed(["TCB", "ABC"])
+    assert list(first.claim()) == ["TCB", "ABC"]
+
+
+def test_consecutive_runs_of_a_live_session_read_the_new_trades(mocker, tmp_path):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC"))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Page size": 10, "Work queue": str(tmp_path / "queue.db")}
+    stock_intraday = StockIntraday(parent=Symbol(config=config), config=config)
+    stock_intraday.parent.read_records = MagicMock(side_effect=lambda **kwargs: iter(["TCB", "ABC"]))
+    stock_intraday.calendar.is_session_closed = MagicMock(return_value=False)
+
+    for head in (5, 15):
+        stock_intraday.get_head = MagicMock(return_value=head)
+        slices = []
+        for stream_slice in stock_intraday.stream_slices():
+            if stream_slice.get("checkpoint"):
+                continue
+            slices.append(stream_slice)
+            stock_intraday.update_cursor(stream_slice["symbol"], head - 1)
+        assert [(stream_slice["symbol"], stream_slice["page"]) for stream_slice in slices] == [("TCB", 0), ("ABC", 0)]
+    assert stock_intraday.state["cursors"] == {"14": "TCB,ABC"}
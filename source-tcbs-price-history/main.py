@@ -7,7 +7,11 @@ import sys
 
 from airbyte_cdk.entrypoint import launch
 from source_tcbs_price_history import SourceTcbsPriceHistory
+from source_tcbs_price_history.plan import plan
 
 if __name__ == "__main__":
     source = SourceTcbsPriceHistory()
-    launch(source, sys.argv[1:])
+    if sys.argv[1:2] == ["plan"]:
+        plan(source, sys.argv[2:])
+    else:
+        launch(source, sys.argv[1:])
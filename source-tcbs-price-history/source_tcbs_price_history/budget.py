@@ -0,0 +1,31 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+import time
+
+
+class Budget:
+    """
+    Time and request budget of a run, 0 means no limit
+    The clock starts with the stream's first slice, requests are counted as their responses are parsed
+    A spent budget does not interrupt a slice, the stream stops before the next one so the last checkpoint covers everything read
+    """
+
+    def __init__(self, seconds: float = 0, requests: int = 0):
+        self.seconds = seconds
+        self.requests = requests
+        self.spent = 0
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+        self.spent = 0
+
+    def spend(self, requests: int = 1):
+        self.spent += requests
+
+    @property
+    def exhausted(self) -> bool:
+        if self.requests and self.spent >= self.requests:
+            return True
+        return bool(self.seconds and self.started is not None and time.monotonic() - self.started >= self.seconds)
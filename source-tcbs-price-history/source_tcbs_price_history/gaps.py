@@ -0,0 +1,76 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+from datetime import date, timedelta
+from typing import List, Mapping, MutableMapping, Tuple
+
+from .trading_calendar import TradingCalendar
+
+
+class GapIndex:
+    """
+    Trading days missing from the bars ingested so far, per symbol
+    Together with the symbol's cursor this is the index of covered days: everything up to the cursor except the gaps
+    Only symbols with gaps are kept, gaps are stored as ranges of consecutive trading days: {"TCB": "2021-03-01:2021-03-05,2022-01-03"}
+    The encoded index is cached until the gaps change, Airbyte reads the state after every slice
+    """
+
+    def __init__(self, calendar: TradingCalendar):
+        self.calendar = calendar
+        self.missing: MutableMapping[str, set] = {}
+        self._encoded = None
+
+    def record(self, symbol: str, after: str, until: str, received: List[str], failed: bool = False):
+        """
+        Replace what is known about the trading days in (after, until] with what a window answered for them:
+        all of them are missing when the window failed, the ones after its last bar when it came back partial
+        A weekday without a bar before the last one was not traded, a holiday or a suspension, and a window without any bar
+        leaves the cursor where it was, so neither is a gap
+        """
+        start, end = date.fromisoformat(after) + timedelta(1), date.fromisoformat(until)
+        expected = {day.isoformat() for day in self.calendar.trading_days(start, end)}
+        missing = {day for day in self.missing.get(symbol, ()) if day not in expected}
+        if failed:
+            missing.update(expected)
+        elif received:
+            missing.update(day for day in expected if day > received[-1])
+        self.set(symbol, missing)
+
+    def resolve(self, symbol: str, start: str, end: str):
+        "Forget the gaps of a symbol in [start, end], after they have been requested again"
+        self.set(symbol, {day for day in self.missing.get(symbol, ()) if not start <= day <= end})
+
+    def set(self, symbol: str, missing: set):
+        self._encoded = None
+        if missing:
+            self.missing[symbol] = missing
+        else:
+            self.missing.pop(symbol, None)
+
+    def ranges(self, symbol: str) -> List[Tuple[str, str]]:
+        "Collapse the missing days of a symbol into ranges of consecutive trading days"
+        ranges = []
+        for day in sorted(self.missing.get(symbol, ())):
+            if ranges and self.calendar.previous_trading_day(date.fromisoformat(day)).isoformat() == ranges[-1][1]:
+                ranges[-1][1] = day
+            else:
+                ranges.append([day, day])
+        return [(start, end) for start, end in ranges]
+
+    def encode(self) -> Mapping[str, str]:
+        if self._encoded is None:
+            self._encoded = {
+                symbol: ",".join(start if start == end else f"{start}:{end}" for start, end in self.ranges(symbol)) for symbol in self.missing
+            }
+        return self._encoded
+
+    def load(self, value: Mapping[str, str]):
+        self.missing = {}
+        self._encoded = None
+        for symbol, ranges in value.items():
+            missing = set()
+            for gap in ranges.split(","):
+                start, _, end = gap.partition(":")
+                days = self.calendar.trading_days(date.fromisoformat(start), date.fromisoformat(end or start))
+                missing.update(day.isoformat() for day in days)
+            self.set(symbol, missing)
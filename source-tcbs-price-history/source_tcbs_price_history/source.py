@@ -1,19 +1,34 @@
 #
 # Copyright (c) 2023 Airbyte, Inc., all rights reserved.
 #
-import requests, time
+import requests, time, zlib
 from abc import ABC
-from typing import Any, Iterable, List, Mapping, Optional, Tuple
+from bisect import bisect_right
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Mapping, Optional, Tuple
 from datetime import datetime, timedelta
 from airbyte_cdk.models import SyncMode
 from airbyte_cdk.sources import AbstractSource
 from airbyte_cdk.sources.streams import Stream, IncrementalMixin
 from airbyte_cdk.sources.streams.http import HttpStream, HttpSubStream
 from airbyte_cdk.sources.streams.http.auth import NoAuth
+from .budget import Budget
+from .cost_profile import CostProfile
+from .circuit import CircuitBreaker, CircuitOpenError
+from .hedging import HedgedAdapter, Hedger
+from .negative_cache import NegativeCache
+from .universe import SymbolUniverse
+from .decode_pool import DecodePool
+from .gaps import GapIndex
+from .state import decode_gaps, decode_pending, decode_retired, decode_state, encode_state
+from .trading_calendar import EXCHANGE_HOLIDAYS, TradingCalendar
+from .work_queue import WorkQueue
 
 class Symbol(HttpStream, IncrementalMixin):
     url_base = None
     primary_key = cursor_field = "tradingDate"
+    start_date = "2000-01-01"
 
     def str_to_date(self, string):  
         "'2000-01-01' -> datetime.date(2000, 1, 1)"
@@ -24,12 +39,26 @@ class Symbol(HttpStream, IncrementalMixin):
         "Cache symbol list to disk to prevent calling the URL everytime we get price history"
         return True
 
-    def __init__(self, config: Mapping[str, Any], **kwargs):
+    def __init__(self, config: Mapping[str, Any], universe: SymbolUniverse = None, **kwargs):
         super().__init__()
 
         self.fast_mode = config["Fast mode"]
-        self.url = config["Symbol URL"]
+        self.universe = universe or SymbolUniverse(config)
+        self.shard_index = config.get("Shard index", 0)
+        self.shard_count = config.get("Shard count", 1)
+        self.circuit = CircuitBreaker(config.get("Circuit failures", 0), config.get("Circuit cool-down", 60), config.get("Circuit mode", "pause") == "pause")
+        self.hedger = Hedger(
+            config.get("Connect timeout", 10), config.get("Read timeout", 60), config.get("Hedge percentile", 0), config.get("Hedge ratio", 0.05), circuit=self.circuit
+        )
+        for prefix in ("https://", "http://"):
+            self._session.mount(prefix, HedgedAdapter(self.hedger))
         self.day_offset = config["Day offset"]
+        self.calendar = TradingCalendar(EXCHANGE_HOLIDAYS + tuple(config.get("Holidays", [])))
+        self.gaps = GapIndex(self.calendar)
+        self.cost_profile = CostProfile(config.get("Cost profile"))
+        self.negative_cache = NegativeCache(config.get("Negative cache"), config.get("Negative cache TTL", 7))
+        self.decode_pool = DecodePool(config.get("Decode workers", 0))
+        self.budget = Budget(config.get("Time budget", 0), config.get("Request budget", 0))
 
         """
         Fill the _cursor_value with ticker symbol from url
@@ -37,20 +66,70 @@ class Symbol(HttpStream, IncrementalMixin):
         Print format: {"TCB":"2023-06-23", "ABC":"2023-06-23"}
         """
 
-        response = requests.get(config["Symbol URL"]).text.split(",")
-        response = response[:5] if self.fast_mode else response
-        self._cursor_value = dict.fromkeys(response, self.str_to_date("2000-01-01"))
+        listed = [symbol for symbol in self.universe.symbols(self.hedger) if self.in_shard(symbol)]
+        response = listed[:5] if self.fast_mode else listed
+        self._cursor_value = dict.fromkeys(response, self.str_to_date(self.start_date))
+        self._listed = set(listed)
+        self._pending = []
+        self._retired = {}
+        self._listings = []
+        self._delisted = []
+        self._state = None
 
     @property
     def state(self) -> Mapping[str, Any]:
-        "Return the _cursor_value to show on UI at Connection > Settings  > Advanced"
-        return self._cursor_value
+        """
+        Return the _cursor_value to show on UI at Connection > Settings  > Advanced
+        The encoded state is cached and only rebuilt after a cursor moved, since Airbyte reads it after every slice
+        """
+        if self._state is None:
+            self._state = encode_state(self._cursor_value, self.gaps.encode(), self._pending, self._retired)
+            if self.shard_count > 1:
+                # Each shard only holds the cursors of its own symbols, the tag tells the shard states apart when they are merged to reshard
+                self._state["shard"] = f"{self.shard_index}/{self.shard_count}"
+        return self._state
     
     @state.setter
     def state(self, value: Mapping[str, Any]):
-        "Update _cursor_value with latest timestamp in ingested record"
-        for key in self._cursor_value:    
-            self._cursor_value[key] = self.str_to_date(value[key][:10])
+        """
+        Update _cursor_value with latest timestamp in ingested record
+        The universe of the previous run is diffed against the symbol list: the cursors of symbols that left it, delisted or filtered out, are archived
+        under `retired`, a re-listed symbol gets its archived cursor back instead of starting over at start_date,
+        and the symbols the previous run did not have are listings, backfilled in their own lane
+        """
+        cursors = decode_state(value)
+        retired = decode_retired(value)
+        for key in self._cursor_value:
+            if key in cursors:
+                self._cursor_value[key] = self.str_to_date(cursors[key])
+            elif key in retired:
+                self._cursor_value[key] = self.str_to_date(retired[key])
+        # The symbols of another shard are left to it, and a fast mode run still knows the whole symbol list
+        delisted = {symbol: cursor for symbol, cursor in cursors.items() if symbol not in self._listed and self.in_shard(symbol)}
+        self._retired = {
+            symbol: self.str_to_date(cursor) for symbol, cursor in (retired | delisted).items() if symbol not in self._listed and self.in_shard(symbol)
+        }
+        self._delisted = sorted(delisted)
+        # Without a previous universe every symbol would be a listing, they all go through the usual plan then
+        self._listings = [symbol for symbol in self._cursor_value if symbol not in cursors] if cursors else []
+        self.gaps.load({symbol: gaps for symbol, gaps in decode_gaps(value).items() if symbol in self._cursor_value})
+        self._pending = [symbol for symbol in decode_pending(value) if symbol in self._cursor_value]
+        self._state = None
+
+    def update_cursor(self, symbol: str, cursor_date):
+        "Move a symbol's cursor and invalidate the cached state"
+        self._cursor_value[symbol] = cursor_date
+        self._state = None
+
+    @property
+    def halted(self) -> bool:
+        "No further slice is read once the budget is spent, or once a circuit opened with the `Circuit mode` pause"
+        return self.budget.exhausted or self.circuit.paused
+
+    def set_pending(self, symbols: List[str]):
+        "Remember the symbols a spent budget left, they are read first next run"
+        self._pending = symbols
+        self._state = None
     
     def next_page_token(self, response: requests.Response):
         "The API does not offer pagination, so we return None to indicate there are no more pages in the response"
@@ -67,7 +146,7 @@ class Symbol(HttpStream, IncrementalMixin):
         Complete the URL to ingest data. Airbyte see concat url_base + path() as URL
         Since the base URL stored in config (Can not be assigned to url_base before init), we will store the full URL in path()
         """
-        return self.url
+        return self.universe.url
 
     def parse_response(
         self,
@@ -78,53 +157,335 @@ class Symbol(HttpStream, IncrementalMixin):
     ) -> Iterable[Mapping]:    
         """
         The symbol file content will look like this "VVS,XDC,HSV,CST,BVL,SGI,TOS,VTZ,SSH,BCA,GMH,BIG"
-        So this function collect the text and transform to a list of symbol
+        So this function collect the text and transform to a list of symbol, SSI's organization list is filtered instead, see universe
         """
-        response = response.text.split(",")
+        response = [symbol for symbol in self.universe.parse(response) if self.in_shard(symbol)]
         return response[:5] if self.fast_mode else response
 
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[str]:
+        "Symbols of the `Symbol source`, through the `Symbol cache` when there is one"
+        symbols = [symbol for symbol in self.universe.symbols(self.hedger) if self.in_shard(symbol)]
+        return symbols[:5] if self.fast_mode else symbols
+
+    def in_shard(self, symbol: str) -> bool:
+        "Keep the symbols of this connection's shard, crc32 is stable across processes while hash() is salted per process"
+        return zlib.crc32(symbol.encode()) % self.shard_count == self.shard_index
+
 class SymbolSubStream(HttpSubStream, Symbol, ABC):
     raise_on_http_errors = False 
 
     def __init__(self, config: Mapping[str, Any], parent: Symbol, **kwargs):
-        super().__init__(config=config, parent=parent, **kwargs)
+        # The symbol list is requested once, by the parent
+        super().__init__(config=config, parent=parent, universe=parent.universe, **kwargs)
+
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        # Symbol.read_records gives the symbol list, the slices of a sub stream are read over HTTP
+        records = HttpStream.read_records(self, sync_mode=sync_mode, stream_slice=stream_slice, **kwargs)
+        yield from self.until_circuit_opens(records, stream_slice)
+
+    def until_circuit_opens(self, records: Iterable[Mapping[str, Any]], stream_slice: Any) -> Iterable[Mapping[str, Any]]:
+        "Records of a slice, cut off without failing the sync when a circuit opens and the `Circuit mode` is pause"
+        try:
+            yield from records
+        except CircuitOpenError as error:
+            if not self.circuit.pause:
+                raise
+            self.logger.warning(f"{error}, the rest of the slice {stream_slice} is left for the next run")
+
+    def skip_negative(self, symbols: Iterable[str], url: Callable[[str], str]) -> List[str]:
+        "Symbols to request, the ones the `Negative cache` had nothing for within its TTL are logged and skipped until their re-probe"
+        symbols, skipped = self.negative_cache.select(symbols, url)
+        if skipped:
+            self.logger.info(f"Negative cache: skipped {len(skipped)} symbols without data within the last {self.negative_cache.ttl} days: {','.join(skipped)}")
+        return symbols
+
+def window_bars(response: Mapping[str, Any], ticker: str) -> Tuple[List[Mapping[str, Any]], List[str]]:
+    """
+    Bars of a decoded window with their ticker, each one later than the ones before, and their dates
+    tradingDate is an ISO timestamp, so dates are compared as text
+    Defined at module level so that a DecodePool worker can run it
+    """
+    bars, dates = [], []
+    latest_date = ""
+    for record in response["data"]:
+        record_date = record["tradingDate"][:10]
+        if latest_date < record_date:
+            latest_date = record_date
+            record["ticker"] = ticker
+            bars.append(record)
+            dates.append(record_date)
+    return bars, dates
+
 
 class PriceHistory(SymbolSubStream):
- 
-    def path(self, *, stream_state: Mapping[str, Any] = None, stream_slice: Mapping[str, Any] = None, next_page_token: Mapping[str, Any] = None) -> str:
+
+    def __init__(self, config: Mapping[str, Any], parent: Symbol, **kwargs):
+        super().__init__(config=config, parent=parent, **kwargs)
+
+        self.backfill_window = config.get("Backfill window", 365)
+        self.backfill_workers = config.get("Backfill workers", 4)
+        self.repair_gaps = config.get("Repair gaps", False)
+        self._prefetched = {}
+        self.work_queue = WorkQueue(config["Work queue"], self.name, config.get("Work lease", 300)) if config.get("Work queue") else None
+
+    def bars_url(self, ticker: str, start_date: str, end_date: str) -> str:
         "URL example: 'https://apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term?ticker=TCB&type=stock&resolution=D&from=1687798800&to=1687798800'"
-        start_timestamp = int(time.mktime(self._cursor_value[stream_slice].timetuple()))
-        end_datetime = datetime.today() - timedelta(self.day_offset) 
-        end_timestamp = int(time.mktime(end_datetime.date().timetuple()))
-        return f'https://apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term?ticker={stream_slice}&type=stock&resolution=D&from={start_timestamp}&to={end_timestamp}'
- 
+        start_timestamp = int(time.mktime(self.str_to_date(start_date).timetuple()))
+        end_timestamp = int(time.mktime(self.str_to_date(end_date).timetuple()))
+        return f'https://apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term?ticker={ticker}&type=stock&resolution=D&from={start_timestamp}&to={end_timestamp}'
+
+    def path(self, *, stream_state: Mapping[str, Any] = None, stream_slice: Mapping[str, Any] = None, next_page_token: Mapping[str, Any] = None) -> str:
+        return self.bars_url(stream_slice["ticker"], stream_slice["from"], stream_slice["to"])
+
+    def family_url(self, ticker: str) -> str:
+        "URL of a window of the symbol, it names the endpoint family of the `Negative cache`"
+        return self.bars_url(ticker, self.start_date, self.start_date)
+
+    def end_date(self):
+        "Last closed trading session, no later than `Day offset` days before today"
+        end_date = self.calendar.last_closed_session()
+        if self.day_offset:
+            end_date = min(end_date, (datetime.today() - timedelta(self.day_offset)).date())
+        return end_date
+
+    def ticker_slices(self, ticker: str) -> List[Mapping[str, str]]:
+        """
+        Split the range between the symbol's cursor and the end date into windows of `Backfill window` days
+        A symbol whose cursor already covers the last closed session gets no slice and costs no request,
+        an up to date symbol gets a single slice, a new symbol starting at 2000-01-01 gets one slice per window
+        """
+        start_date = self._cursor_value[ticker]
+        end_date = self.end_date()
+        if start_date >= end_date:
+            return []
+        if not self.backfill_window:
+            return [{"ticker": ticker, "from": start_date.isoformat(), "to": end_date.isoformat()}]
+
+        slices = []
+        while True:
+            window_end = min(start_date + timedelta(self.backfill_window), end_date)
+            slices.append({"ticker": ticker, "from": start_date.isoformat(), "to": window_end.isoformat()})
+            if window_end >= end_date:
+                return slices
+            start_date = window_end
+
+    def repair_slices(self, ticker: str) -> List[Mapping[str, Any]]:
+        """
+        One slice per range of missing trading days of the symbol up to its cursor,
+        the days after the cursor are requested again by the regular slices anyway
+        """
+        cursor = self._cursor_value[ticker].isoformat()
+        return [
+            {"ticker": ticker, "from": start, "to": min(end, cursor), "repair": True}
+            for start, end in self.gaps.ranges(ticker)
+            if start <= cursor
+        ]
+
     def stream_slices(self, **kwargs) -> Iterable[Optional[Mapping[str, any]]]:
-        "Get the symbol list" 
-        for record in self.parent.read_records(sync_mode=SyncMode.full_refresh):
-            yield record
- 
-    def parse_response(self, response: requests.Response, **kwargs) -> Iterable[Mapping]:
-        "Parse json records from URL"
-        response = response.json()
-        for record in response["data"]:
-            record["ticker"] = response["ticker"]
-            yield record
-    
-    def read_records(self, *args, **kwargs) -> Iterable[Mapping[str, Any]]:
-        "Update symbol's cursor value with highest timestamp in corresponding symbol's record"
-        for record in super().read_records(*args, **kwargs):            
-            latest_record_date = self.str_to_date(record['tradingDate'][:10])
-            if self._cursor_value[record["ticker"]] < latest_record_date:
-                self._cursor_value[record["ticker"]] = latest_record_date
+        """
+        Get the symbol list, the windows of a backfilling symbol are fetched concurrently while being read in date order,
+        so the cursor and the checkpoint move after each window
+        With `Repair gaps`, the missing ranges of a symbol are requested before its new bars
+        Slices are planned from the cursors without any request, symbols with the most windows are read first
+        so a long backfill does not start last and stretch the sync
+        Listings, the symbols the previous run did not have, are read last: their windows are requested by a lane of their own,
+        a few ahead of the reader, so their backfill starts alongside the daily slices of the other symbols instead of ahead of them
+        The `Cost profile` gives an estimate of the planned requests up front, and learns from them once all slices were read
+        Symbols without any bar in their windows of a run are skipped while the `Negative cache` holds them, their cursor stays
+        where it was so a re-listed symbol is backfilled from there
+        Once the `Time budget` or `Request budget` is spent, or a circuit opened with the `Circuit mode` pause,
+        no further slice is read, the symbols left are read first next run,
+        ahead of the most stale ones: among symbols with as many windows, the oldest cursor goes first
+        With a `Work queue` the symbols are leased from the queue shared by the workers of the run instead, see work_queue
+        The last slice is a checkpoint without any request, which carries the symbols left and the cursors merged from the queue
+        """
+        if self.work_queue is not None:
+            self.work_queue.start(self.end_date().isoformat())
+            self.merge_work_queue()
+        plan = []
+        for record in self.skip_negative(self.parent.read_records(sync_mode=SyncMode.full_refresh), self.family_url):
+            slices = (self.repair_slices(record) if self.repair_gaps else []) + self.ticker_slices(record)
+            if slices:
+                plan.append((record, slices))
+        if self._listings or self._delisted:
+            self.logger.info(
+                f"Symbol universe changed: {len(self._listings)} listings backfilled in their own lane ({','.join(self._listings)}), "
+                f"{len(self._delisted)} symbols left the symbol list and their cursors are archived ({','.join(self._delisted)})"
+            )
+        # With a Work queue the workers share the symbols, no lane prefetches the ones another worker may lease
+        listings = set(self._listings) if self.work_queue is None else set()
+        pending = {symbol: position for position, symbol in enumerate(self._pending)}
+        plan.sort(
+            key=lambda planned: (pending.get(planned[0], len(pending)), planned[0] in listings, -len(planned[1]), self._cursor_value[planned[0]])
+        )
+        request_counts = {record: len(slices) for record, slices in plan}
+        self.logger.info(self.cost_profile.describe(request_counts, request_counts))
+        if self.work_queue is not None:
+            self.work_queue.seed(record for record, _ in plan)
+            # A symbol this worker has no slice for was read by another worker or is up to date, it is acknowledged right away
+            planned = dict(plan)
+            plan = ((record, planned.get(record, [])) for record in self.work_queue.claim())
+
+        self.budget.start()
+        deferred = []
+        # With a Work queue the plan is leased one symbol at a time, it has no listings to go through
+        listing_windows = iter(
+            [(record, stream_slice) for record, slices in plan if record in listings for stream_slice in slices if not stream_slice.get("repair")]
+            if listings
+            else []
+        )
+        lane_urls = []
+        with ThreadPoolExecutor(self.backfill_workers) as executor, ThreadPoolExecutor(self.backfill_workers, thread_name_prefix="listings") as lane:
+            try:
+                for position, (record, slices) in enumerate(plan):
+                    if record not in listings and len([stream_slice for stream_slice in slices if not stream_slice.get("repair")]) > 1:
+                        self.prefetch(executor, record, slices)
+                    for stream_slice in slices:
+                        if self.halted:
+                            deferred = [record] if self.work_queue is not None else [record for record, _ in plan[position:]]
+                            break
+                        self.fill_lane(lane, listing_windows, lane_urls)
+                        yield stream_slice
+                    if deferred:
+                        break
+                    if self.work_queue is not None:
+                        self.work_queue.ack(record, self._cursor_value[record].isoformat())
+            finally:
+                # Windows not requested yet are dropped, so leaving the executors does not wait for them
+                for future in self._prefetched.values():
+                    future.cancel()
+                self._prefetched.clear()
+
+        if self.work_queue is not None:
+            # The symbol being read when the budget was spent goes back to the queue
+            if deferred:
+                self.work_queue.release(deferred[0])
+            self.merge_work_queue()
+        if deferred:
+            reason = "A circuit opened" if self.circuit.paused else "Budget spent"
+            self.logger.warning(f"{reason} after {self.budget.spent} requests, {len(deferred)} symbols are left for the next run: {','.join(deferred)}")
+        self.set_pending(deferred)
+        self.cost_profile.save()
+        self.negative_cache.save()
+        self.decode_pool.close()
+        # Airbyte emits the state after each slice is read and not once the slices ran out,
+        # the state set since the last symbol was read goes out with this last slice
+        yield {"checkpoint": True}
+
+    def prefetch(self, executor: ThreadPoolExecutor, record: str, slices: List[Mapping[str, Any]]):
+        "Start the requests of the symbol's windows, read_records then takes their answers"
+        for stream_slice in slices:
+            if not stream_slice.get("repair"):
+                url = self.bars_url(stream_slice["ticker"], stream_slice["from"], stream_slice["to"])
+                self._prefetched[url] = executor.submit(self.fetch_window, url, record)
+
+    def fill_lane(self, lane: ThreadPoolExecutor, windows: Iterator[Tuple[str, Mapping[str, Any]]], lane_urls: List[str]):
+        "Keep the listing windows requested by the lane at `Backfill workers` x 2 ahead of the reader, the answers are held until it reads them"
+        lane_urls[:] = [url for url in lane_urls if url in self._prefetched]
+        for record, stream_slice in islice(windows, 2 * self.backfill_workers - len(lane_urls)):
+            url = self.bars_url(stream_slice["ticker"], stream_slice["from"], stream_slice["to"])
+            self._prefetched[url] = lane.submit(self.fetch_window, url, record)
+            lane_urls.append(url)
+
+    def merge_work_queue(self):
+        "Take the cursors the workers of the run acknowledged, when they are ahead"
+        for symbol, cursor in self.work_queue.cursors().items():
+            if symbol in self._cursor_value and self.str_to_date(cursor) > self._cursor_value[symbol]:
+                self.update_cursor(symbol, self.str_to_date(cursor))
+
+    def plan(self) -> Iterable[Mapping[str, Any]]:
+        "Slices and requests of each symbol for the plan command, they are known from the cursors and gaps without any request"
+        for record in self.skip_negative(self.parent.read_records(sync_mode=SyncMode.full_refresh), self.family_url):
+            slices = len(self.repair_slices(record) if self.repair_gaps else []) + len(self.ticker_slices(record))
+            yield {"ticker": record, "slices": slices, "requests": slices}
+
+    def read_records(self, sync_mode: SyncMode, stream_slice: Mapping[str, Any] = None, **kwargs) -> Iterable[Mapping[str, Any]]:
+        """
+        Read a prefetched window if there is one, otherwise request the slice with the usual retries,
+        as well when the prefetch failed or was answered with an error: the hedger does not retry a 429 or a 5xx
+        """
+        if stream_slice.get("checkpoint"):
+            return
+        url = self.bars_url(stream_slice["ticker"], stream_slice["from"], stream_slice["to"])
+        future = self._prefetched.pop(url, None)
+        response = future.result()[0] if future is not None and future.exception() is None else None
+        if response is not None and response.ok and not self.should_retry(response):
+            yield from self.parse_response(response, stream_slice=stream_slice, decoded=future.result()[1])
+        else:
+            yield from super().read_records(sync_mode=sync_mode, stream_slice=stream_slice, **kwargs)
+
+    def fetch_window(self, url: str, ticker: str) -> Tuple[requests.Response, Optional[Future]]:
+        "Request a window and start its window_bars right away, so windows are decoded while the earlier ones are emitted"
+        response = self.hedger.get(url)
+        return response, self.decode_pool.decode(response, window_bars, ticker) if response.ok else None
+
+    def parse_response(self, response: requests.Response, stream_slice: Mapping[str, Any] = None, decoded: Future = None, **kwargs) -> Iterable[Mapping]:
+        """
+        Parse json records from URL and keep the records newer than the symbol's cursor
+        The response is decoded by window_bars, `decoded` is its window_bars when a prefetch started it in the `Decode workers`,
+        the bars up to the cursor are cut off with a bisection on their dates and the cursor is moved once per response
+        A failed response leaves the whole slice as a gap, a partial one the trading days of the slice after its last bar
+        """
+        ticker = stream_slice["ticker"]
+        self.cost_profile.record(ticker, response)
+        self.budget.spend()
+        if self.work_queue is not None:
+            self.work_queue.heartbeat(ticker)
+        if stream_slice.get("repair"):
+            yield from self.parse_repair(response, stream_slice)
+            return
+
+        cursor = self._cursor_value[ticker].isoformat()
+        received = []
+        if response.ok:
+            bars, received = (decoded or self.decode_pool.decode(response, window_bars, ticker, inline=True)).result()
+            self.negative_cache.record(ticker, response, bool(received))
+            cut = bisect_right(received, cursor)
+            received = received[cut:]
+            yield from bars[cut:]
+        else:
+            self.negative_cache.record(ticker, response)
+        latest_date = received[-1] if received else cursor
+
+        # A failed window is left to the repair since the next window moves the cursor past it, a 404 tells the symbol has no bar at all.
+        # An answered window only speaks for its own days, the ones before it may be the gaps of a failed window
+        if response.ok:
+            window_start = (self.str_to_date(stream_slice["from"]) - timedelta(1)).isoformat()
+            self.record_gaps(ticker, max(cursor, window_start), stream_slice["to"], received)
+        elif response.status_code != 404:
+            self.record_gaps(ticker, cursor, stream_slice["to"], received, failed=True)
+
+        if latest_date != cursor:
+            self.update_cursor(ticker, self.str_to_date(latest_date))
+
+    def parse_repair(self, response: requests.Response, stream_slice: Mapping[str, Any]) -> Iterable[Mapping]:
+        "Emit the bars of the missing days, the range is resolved once answered, a day still without a bar was not traded"
+        if not response.ok:
+            return
+
+        ticker = stream_slice["ticker"]
+        missing = self.gaps.missing.get(ticker, set())
+        for record in response.json()["data"]:
+            if record["tradingDate"][:10] in missing:
+                record["ticker"] = ticker
                 yield record
 
+        self.gaps.resolve(ticker, stream_slice["from"], stream_slice["to"])
+        self._state = None
+
+    def record_gaps(self, ticker: str, after: str, until: str, received: List[str], failed: bool = False):
+        self.gaps.record(ticker, after, until, received, failed)
+        self._state = None
+
 class SourceTcbsPriceHistory(AbstractSource):
     def check_connection(self, logger, config) -> Tuple[bool, any]:
         "Test the connector, check for invalid arguments"
         try:
-            requests.get(config["Symbol URL"]).text.split(",")
+            SymbolUniverse(config).symbols(Hedger(config.get("Connect timeout", 10), config.get("Read timeout", 60)))
         except:
             return False, "Invalid URL or invalid file content format"
+        if not 0 <= config.get("Shard index", 0) < config.get("Shard count", 1):
+            return False, "Shard index must be between 0 and Shard count - 1"
         return True, None
 
     def streams(self, config: Mapping[str, Any]) -> List[Stream]:
@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+from typing import Any, Iterable, List, Mapping, MutableMapping
+
+STATE_VERSION = 2
+
+
+def group_cursors(cursor_value: Mapping[str, Any]) -> MutableMapping[str, str]:
+    """{"TCB": datetime.date(2023, 6, 23), "ABC": datetime.date(2023, 6, 23)} -> {"2023-06-23": "TCB,ABC"}"""
+    groups = {}
+    for symbol, cursor in cursor_value.items():
+        groups.setdefault(cursor.isoformat(), []).append(symbol)
+    return {cursor: ",".join(symbols) for cursor, symbols in groups.items()}
+
+
+def ungroup_cursors(groups: Mapping[str, str]) -> MutableMapping[str, str]:
+    """{"2023-06-23": "TCB,ABC"} -> {"TCB": "2023-06-23", "ABC": "2023-06-23"}"""
+    cursors = {}
+    for cursor, symbols in groups.items():
+        for symbol in symbols.split(","):
+            cursors[symbol] = cursor
+    return cursors
+
+
+def encode_state(
+    cursor_value: Mapping[str, Any], gaps: Mapping[str, str] = None, pending: Iterable[str] = (), retired: Mapping[str, Any] = None
+) -> MutableMapping[str, Any]:
+    """
+    Group symbols sharing the same cursor date, so the state size follows the number of distinct dates instead of the symbol universe
+    {"TCB": datetime.date(2023, 6, 23), "ABC": datetime.date(2023, 6, 23)}
+    -> {"version": 2, "cursors": {"2023-06-23": "TCB,ABC"}, "gaps": {}, "pending": "", "retired": {}}
+    `gaps` holds the encoded GapIndex, only symbols with missing trading days are listed
+    `pending` lists the symbols a run left when its budget was spent, in the order they are read first next run
+    `retired` archives the cursors of the symbols that left the symbol file, grouped the same way
+    """
+    return {
+        "version": STATE_VERSION,
+        "cursors": group_cursors(cursor_value),
+        "gaps": dict(gaps or {}),
+        "pending": ",".join(pending),
+        "retired": group_cursors(retired or {}),
+    }
+
+
+def decode_state(value: Mapping[str, Any]) -> MutableMapping[str, str]:
+    """
+    Read both the grouped state and the legacy one symbol per key state
+    {"version": 2, "cursors": {"2023-06-23": "TCB,ABC"}} -> {"TCB": "2023-06-23", "ABC": "2023-06-23"}
+    {"TCB": "2023-06-23T00:00:00.000Z"} -> {"TCB": "2023-06-23"}
+    """
+    version = value.get("version")
+    if version is None:
+        return {symbol: cursor[:10] for symbol, cursor in value.items()}
+    if version != STATE_VERSION:
+        raise ValueError(f"Unsupported state version: {version}")
+    return ungroup_cursors(value["cursors"])
+
+
+def decode_gaps(value: Mapping[str, Any]) -> Mapping[str, str]:
+    "Encoded GapIndex, the legacy state does not track gaps"
+    return value.get("gaps", {}) if value.get("version") is not None else {}
+
+
+def decode_pending(value: Mapping[str, Any]) -> List[str]:
+    "Symbols left by the last run, the legacy state does not track them"
+    pending = value.get("pending", "") if value.get("version") is not None else ""
+    return pending.split(",") if pending else []
+
+
+def decode_retired(value: Mapping[str, Any]) -> MutableMapping[str, str]:
+    "Archived cursors of the symbols that left the symbol file, the legacy state does not archive them"
+    return ungroup_cursors(value.get("retired", {})) if value.get("version") is not None else {}
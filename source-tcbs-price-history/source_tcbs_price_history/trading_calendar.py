@@ -0,0 +1,75 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Optional
+
+# HOSE and HNX trade from 9:00 to 15:00 Vietnam time (UTC+7), the connector container runs in UTC
+MARKET_TIMEZONE = timezone(timedelta(hours=7))
+SESSION_OPEN = time(9, 0)
+SESSION_CLOSE = time(15, 0)
+
+# Days HOSE and HNX were closed on a weekday: New Year, Tet, Hung Kings, Reunification, Labour and National Day with their carry-overs
+EXCHANGE_HOLIDAYS = (
+    "2020-01-01", "2020-01-23", "2020-01-24", "2020-01-27", "2020-01-28", "2020-01-29", "2020-04-02", "2020-04-30", "2020-05-01", "2020-09-02",
+    "2021-01-01", "2021-02-10", "2021-02-11", "2021-02-12", "2021-02-15", "2021-02-16", "2021-04-21", "2021-04-30", "2021-05-03", "2021-09-02",
+    "2021-09-03",
+    "2022-01-03", "2022-01-31", "2022-02-01", "2022-02-02", "2022-02-03", "2022-02-04", "2022-04-11", "2022-05-02", "2022-05-03", "2022-09-01",
+    "2022-09-02",
+    "2023-01-02", "2023-01-20", "2023-01-23", "2023-01-24", "2023-01-25", "2023-01-26", "2023-05-01", "2023-05-02", "2023-05-03", "2023-09-01",
+    "2023-09-04",
+    "2024-01-01", "2024-02-08", "2024-02-09", "2024-02-12", "2024-02-13", "2024-02-14", "2024-04-18", "2024-04-29", "2024-04-30", "2024-05-01",
+    "2024-09-02", "2024-09-03",
+    "2025-01-01", "2025-01-27", "2025-01-28", "2025-01-29", "2025-01-30", "2025-01-31", "2025-04-07", "2025-04-30", "2025-05-01", "2025-05-02",
+    "2025-09-01", "2025-09-02",
+)
+
+
+class TradingCalendar:
+    """
+    Trading days of the Vietnamese stock exchanges: weekdays that are not in the holiday list
+    Holidays are given as ISO dates, e.g. ["2023-01-02", "2023-04-29"], the sources add the `Holidays` of their config to EXCHANGE_HOLIDAYS
+    """
+
+    def __init__(self, holidays: Iterable[str] = ()):
+        self.holidays = {date.fromisoformat(holiday) for holiday in holidays}
+
+    def now(self) -> datetime:
+        return datetime.now(MARKET_TIMEZONE)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def previous_trading_day(self, day: date) -> date:
+        "Last trading day strictly before `day`"
+        day -= timedelta(1)
+        while not self.is_trading_day(day):
+            day -= timedelta(1)
+        return day
+
+    def trading_days(self, start: date, end: date) -> Iterable[date]:
+        "Trading days between `start` and `end`, both included"
+        day = start
+        while day <= end:
+            if self.is_trading_day(day):
+                yield day
+            day += timedelta(1)
+
+    def session_date(self, moment: Optional[datetime] = None) -> date:
+        "Date of the current session, or of the last one when the market has not opened today"
+        moment = moment or self.now()
+        if self.is_trading_day(moment.date()) and moment.time() >= SESSION_OPEN:
+            return moment.date()
+        return self.previous_trading_day(moment.date())
+
+    def last_closed_session(self, moment: Optional[datetime] = None) -> date:
+        "Date of the last session whose data is final"
+        moment = moment or self.now()
+        if self.is_trading_day(moment.date()) and moment.time() >= SESSION_CLOSE:
+            return moment.date()
+        return self.previous_trading_day(moment.date())
+
+    def is_session_closed(self, moment: Optional[datetime] = None) -> bool:
+        "Whether the data of the current session is final"
+        moment = moment or self.now()
+        return self.session_date(moment) == self.last_closed_session(moment)
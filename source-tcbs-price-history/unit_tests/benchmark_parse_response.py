@@ -0,0 +1,57 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+"""
+Micro-benchmark of the bar filter of PriceHistory.parse_response on a window of 6,000 daily bars, JSON decoding excluded
+Run from the connector directory: python -m unit_tests.benchmark_parse_response
+"""
+
+import timeit
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+from source_tcbs_price_history.source import window_bars
+
+BARS = 6000
+RUNS = 20
+
+
+def bar(trading_date):
+    "Bar as served by the API"
+    return {"open": 27000, "high": 27100, "low": 26900, "close": 27050, "volume": 1000, "tradingDate": f"{trading_date.isoformat()}T00:00:00.000Z"}
+
+
+def text_filter(response, cursor):
+    "Dates compared as text, the bars up to the cursor cut off with a bisection, as parse_response does"
+    bars, received = window_bars(response, "TCB")
+    cut = bisect_right(received, cursor.isoformat())
+    return bars[cut:]
+
+
+def strptime_filter(response, cursor):
+    "Every bar's date parsed and compared with a cursor moved once per record, as parse_response used to do"
+    bars = []
+    for record in response["data"]:
+        record["ticker"] = response["ticker"]
+        record_date = datetime.strptime(record["tradingDate"][:10], "%Y-%m-%d").date()
+        if cursor < record_date:
+            cursor = record_date
+            bars.append(record)
+    return bars
+
+
+def main():
+    start = date(2000, 1, 1)
+    response = {"ticker": "TCB", "data": [bar(start + timedelta(day)) for day in range(BARS)]}
+    cursor = start - timedelta(1)
+    assert text_filter(response, cursor) == strptime_filter(response, cursor)
+
+    timings = {}
+    for name, bar_filter in (("text", text_filter), ("strptime", strptime_filter)):
+        timings[name] = min(timeit.repeat(lambda: bar_filter(response, cursor), number=1, repeat=RUNS))
+        print(f"{name:>8}: {timings[name] * 1e3:8.2f} ms per window of {BARS} bars")
+    print(f"{timings['strptime'] / timings['text']:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
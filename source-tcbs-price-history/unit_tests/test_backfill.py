@@ -0,0 +1,120 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import json
+import logging
+from datetime import date
+from unittest.mock import MagicMock
+
+import requests
+from airbyte_cdk.models import AirbyteStream, ConfiguredAirbyteCatalog, ConfiguredAirbyteStream, DestinationSyncMode, SyncMode, Type
+from pytest import fixture
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+from source_tcbs_price_history.budget import Budget
+from source_tcbs_price_history.source import PriceHistory, SourceTcbsPriceHistory, Symbol
+
+
+@fixture
+def price_history(mocker):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC"))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Day offset": 0, "Backfill window": 365}
+    return PriceHistory(parent=Symbol(config=config), config=config)
+
+
+def test_ticker_slices_split_backfill_in_windows(price_history):
+    slices = price_history.ticker_slices("TCB")
+    assert slices[0]["from"] == "2000-01-01"
+    assert slices[-1]["to"] == price_history.end_date().isoformat()
+    assert all(earlier["to"] == later["from"] for earlier, later in zip(slices, slices[1:]))
+
+
+def test_ticker_slices_up_to_date_symbol(price_history):
+    end_date = price_history.end_date()
+    previous_session = price_history.calendar.previous_trading_day(end_date)
+    price_history.update_cursor("ABC", previous_session)
+    assert price_history.ticker_slices("ABC") == [{"ticker": "ABC", "from": previous_session.isoformat(), "to": end_date.isoformat()}]
+
+
+def test_ticker_slices_skip_symbol_covering_last_session(price_history):
+    price_history.update_cursor("ABC", price_history.end_date())
+    assert price_history.ticker_slices("ABC") == []
+
+
+def test_stream_slices_start_with_the_longest_backfill(price_history):
+    price_history.parent.read_records = MagicMock(return_value=iter(["TCB", "ABC"]))
+    price_history.update_cursor("TCB", price_history.calendar.previous_trading_day(price_history.end_date()))
+
+    slices = list(price_history.stream_slices())
+    # The last slice only carries the state
+    assert slices[-1] == {"checkpoint": True}
+    tickers = [stream_slice["ticker"] for stream_slice in slices[:-1]]
+    assert tickers[0] == "ABC" and tickers[-1] == "TCB"
+    assert tickers.count("TCB") == 1
+
+
+def test_spent_budget_leaves_symbols_for_the_next_run(price_history):
+    price_history.parent.read_records = MagicMock(return_value=iter(["TCB", "ABC"]))
+    price_history.update_cursor("ABC", price_history.calendar.previous_trading_day(price_history.end_date()))
+    price_history.budget = Budget(requests=2)
+
+    slices = []
+    for stream_slice in price_history.stream_slices():
+        slices.append(stream_slice)
+        price_history.budget.spend()
+    assert [stream_slice.get("ticker") for stream_slice in slices] == ["TCB", "TCB", None]
+    assert price_history.state["pending"] == "TCB,ABC"
+
+    price_history.set_pending(["ABC", "TCB"])
+    price_history.parent.read_records = MagicMock(return_value=iter(["TCB", "ABC"]))
+    price_history.budget = Budget()
+    tickers = [stream_slice.get("ticker") for stream_slice in price_history.stream_slices()]
+    assert tickers[0] == "ABC" and tickers.count("ABC") == 1
+    assert price_history.state["pending"] == ""
+
+
+def test_shards_split_the_symbol_list(mocker):
+    symbols = ["TCB", "ABC", "VNM", "FPT", "HPG", "SSI", "MWG", "VCB"]
+    mocker.patch("requests.Session.get", return_value=MagicMock(text=",".join(symbols)))
+    shards = []
+    for shard_index in range(3):
+        config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Day offset": 0, "Shard index": shard_index, "Shard count": 3}
+        shards.append(PriceHistory(parent=Symbol(config=config), config=config))
+
+    assert sorted(symbol for shard in shards for symbol in shard._cursor_value) == sorted(symbols)
+    assert shards[1].state["shard"] == "1/3"
+
+    # Restoring the state of another shard never moves a cursor of this one
+    other_symbol = next(iter(shards[0]._cursor_value))
+    shards[0].update_cursor(other_symbol, date(2023, 6, 23))
+    shards[1].state = shards[0].state
+    assert other_symbol not in shards[1]._cursor_value
+    assert set(shards[1]._cursor_value) == {symbol for symbol in symbols if shards[1].in_shard(symbol)}
+
+
+def answer(request, payload):
+    "Response of the API to a prepared request"
+    response = requests.Response()
+    response.status_code, response._content, response.url, response.request = 200, json.dumps(payload).encode(), request.url, request
+    response.raw = HTTPResponse(status=200, request_url=request.url)
+    return response
+
+
+def test_symbols_left_by_a_spent_budget_reach_the_emitted_state(mocker):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC", status_code=200))
+    mocker.patch.object(HTTPAdapter, "send", side_effect=lambda request, **kwargs: answer(request, {"ticker": "TCB", "data": []}))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Day offset": 0, "Backfill window": 0, "Request budget": 1}
+    catalog = ConfiguredAirbyteCatalog(
+        streams=[
+            ConfiguredAirbyteStream(
+                stream=AirbyteStream(name="price_history", json_schema={}, supported_sync_modes=[SyncMode.incremental]),
+                sync_mode=SyncMode.incremental,
+                destination_sync_mode=DestinationSyncMode.append,
+            )
+        ]
+    )
+
+    messages = list(SourceTcbsPriceHistory().read(logging.getLogger("airbyte"), config, catalog))
+    states = [message.state.stream.stream_state.dict() for message in messages if message.type == Type.STATE]
+    assert states[-1]["pending"] in ("TCB", "ABC")
@@ -0,0 +1,57 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from airbyte_cdk.models import SyncMode
+from airbyte_cdk.sources.streams.http import HttpStream
+from source_tcbs_price_history.circuit import CircuitBreaker, CircuitOpenError
+from source_tcbs_price_history.source import PriceHistory, Symbol
+
+
+def failing_call():
+    raise requests.ConnectionError("Connection refused")
+
+
+def test_circuit_opens_after_failures_in_a_row():
+    circuit = CircuitBreaker(failures=2, cooldown=60)
+    circuit.call("bars", lambda: MagicMock(status_code=503))
+    assert not circuit.paused
+    with pytest.raises(requests.ConnectionError):
+        circuit.call("bars", failing_call)
+    assert circuit.paused
+
+    with pytest.raises(CircuitOpenError):
+        circuit.call("bars", lambda: MagicMock(status_code=200))
+    # Other endpoints keep their own circuit
+    assert circuit.call("overview", lambda: MagicMock(status_code=200)).status_code == 200
+
+
+def test_probe_closes_or_reopens_the_circuit():
+    circuit = CircuitBreaker(failures=1, cooldown=0)
+    circuit.call("bars", lambda: MagicMock(status_code=500))
+    circuit.call("bars", lambda: MagicMock(status_code=429))
+    assert circuit.circuits["bars"][0] == 2
+    circuit.call("bars", lambda: MagicMock(status_code=200))
+    assert not circuit.paused and "bars" not in circuit.circuits
+
+
+def test_open_circuit_pauses_the_run(mocker):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC", status_code=200))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Day offset": 0, "Backfill window": 0, "Circuit failures": 1}
+    price_history = PriceHistory(parent=Symbol(config=config), config=config)
+    price_history.parent.read_records = MagicMock(return_value=iter(["TCB", "ABC"]))
+    mocker.patch.object(HttpStream, "read_records", side_effect=lambda *args, **kwargs: price_history.circuit.call("bars", failing_call))
+
+    slices = []
+    for stream_slice in price_history.stream_slices():
+        if stream_slice.get("checkpoint"):
+            break
+        slices.append(stream_slice)
+        with pytest.raises(requests.ConnectionError):
+            list(price_history.read_records(SyncMode.incremental, stream_slice))
+    assert len(slices) == 1
+    assert price_history.state["pending"] == "ABC"
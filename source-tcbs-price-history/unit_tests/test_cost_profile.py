@@ -0,0 +1,38 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import json
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from source_tcbs_price_history.cost_profile import CostProfile
+
+
+def response(size, seconds):
+    return MagicMock(content=b"x" * size, elapsed=timedelta(seconds=seconds))
+
+
+def test_cost_profile_learns_over_runs(tmp_path):
+    path = str(tmp_path / "profile.json")
+    profile = CostProfile(path)
+    for _ in range(4):
+        profile.record("TCB", response(1000, 0.2))
+    profile.save()
+    assert json.load(open(path)) == {"TCB": {"requests": 4, "bytes": 1000, "seconds": 0.2}}
+
+    profile = CostProfile(path)
+    profile.record("TCB", response(3000, 0.4))
+    profile.record("TCB", response(3000, 0.4))
+    profile.save()
+    assert CostProfile(path).profile == {"TCB": {"requests": 3, "bytes": 2000, "seconds": 0.3}}
+    assert profile.estimate("TCB", 10) == (10, 20000, 3.0)
+    assert profile.estimate("ABC") is None
+    assert profile.describe(["TCB", "ABC"]).startswith("Cost profile of 1 out of 2 symbols: about 3 requests")
+
+
+def test_cost_profile_without_path_is_disabled(tmp_path):
+    profile = CostProfile()
+    profile.record("TCB", response(1000, 0.2))
+    profile.save()
+    assert profile.profile == {} and profile.run == {}
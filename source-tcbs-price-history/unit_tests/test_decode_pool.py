@@ -0,0 +1,44 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import json
+from unittest.mock import MagicMock
+
+from source_tcbs_price_history.decode_pool import DecodePool
+from source_tcbs_price_history.source import window_bars
+
+
+def bar(trading_date):
+    return {"close": 27000, "tradingDate": f"{trading_date}T00:00:00.000Z"}
+
+
+def test_window_bars_keep_later_bars():
+    response = {"data": [bar("2023-06-21"), bar("2023-06-22"), bar("2023-06-22"), bar("2023-06-20"), bar("2023-06-23")]}
+    bars, dates = window_bars(response, "TCB")
+    assert dates == ["2023-06-21", "2023-06-22", "2023-06-23"]
+    assert all(record["ticker"] == "TCB" for record in bars)
+
+
+def test_workers_decode_as_the_sync_process():
+    payload = {"data": [bar("2023-06-22"), bar("2023-06-23")]}
+    response = MagicMock(content=json.dumps(payload).encode(), json=MagicMock(return_value=json.loads(json.dumps(payload))))
+
+    inline = DecodePool().decode(response, window_bars, "TCB")
+    assert inline.done()
+    pool = DecodePool(workers=1)
+    try:
+        assert pool.decode(response, window_bars, "TCB").result() == inline.result()
+        assert pool.decode(response).result() == payload
+    finally:
+        pool.close()
+
+
+def test_inline_decode_does_not_start_the_workers():
+    payload = {"data": [bar("2023-06-23")]}
+    response = MagicMock(json=MagicMock(return_value=payload))
+
+    pool = DecodePool(workers=1)
+    decoded = pool.decode(response, window_bars, "TCB", inline=True)
+    assert decoded.done() and decoded.result()[1] == ["2023-06-23"]
+    assert pool.executor is None
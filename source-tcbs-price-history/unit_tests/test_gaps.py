@@ -0,0 +1,63 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from source_tcbs_price_history.gaps import GapIndex
+from source_tcbs_price_history.trading_calendar import TradingCalendar
+
+
+def gap_index():
+    # 2023-05-01 and 2023-05-02 are holidays
+    return GapIndex(TradingCalendar(["2023-05-01", "2023-05-02"]))
+
+
+def test_failed_window_collapses_into_a_range_of_trading_days():
+    gaps = gap_index()
+    gaps.record("TCB", "2023-04-25", "2023-05-05", received=[], failed=True)
+    assert gaps.ranges("TCB") == [("2023-04-26", "2023-05-05")]
+
+
+def test_partial_window_leaves_the_days_after_its_last_bar():
+    gaps = gap_index()
+    # The days without a bar up to the last one were not traded
+    gaps.record("TCB", "2023-04-25", "2023-05-05", received=["2023-04-26", "2023-05-03"])
+    assert gaps.ranges("TCB") == [("2023-05-04", "2023-05-05")]
+
+    gaps.record("ABC", "2023-04-25", "2023-05-05", received=[])
+    assert "ABC" not in gaps.missing
+
+
+def test_record_replaces_known_gaps_of_the_range():
+    gaps = gap_index()
+    gaps.record("TCB", "2023-04-25", "2023-04-28", received=[], failed=True)
+    gaps.record("TCB", "2023-04-26", "2023-04-28", received=["2023-04-27", "2023-04-28"])
+    assert gaps.ranges("TCB") == [("2023-04-26", "2023-04-26")]
+
+
+def test_resolve_drops_symbol_without_gaps():
+    gaps = gap_index()
+    gaps.record("TCB", "2023-04-25", "2023-04-28", received=["2023-04-26"])
+    gaps.resolve("TCB", "2023-04-27", "2023-04-28")
+    assert gaps.encode() == {}
+
+
+def test_encode_load_round_trip():
+    gaps = gap_index()
+    gaps.record("TCB", "2023-04-25", "2023-04-27", received=[], failed=True)
+    gaps.record("TCB", "2023-04-27", "2023-05-05", received=["2023-04-28", "2023-05-03"])
+    encoded = gaps.encode()
+    assert encoded == {"TCB": "2023-04-26:2023-04-27,2023-05-04:2023-05-05"}
+
+    loaded = gap_index()
+    loaded.load(encoded)
+    assert loaded.missing == gaps.missing
+
+
+def test_encoded_index_is_cached_until_the_gaps_change():
+    gaps = gap_index()
+    gaps.record("TCB", "2023-04-25", "2023-04-27", received=[], failed=True)
+    encoded = gaps.encode()
+    assert gaps.encode() is encoded
+
+    gaps.resolve("TCB", "2023-04-26", "2023-04-26")
+    assert gaps.encode() == {"TCB": "2023-04-27"}
@@ -0,0 +1,55 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import time
+from unittest.mock import MagicMock
+
+from source_tcbs_price_history.hedging import HEDGE_WORKERS, Hedger, endpoint_family
+
+
+def test_endpoint_family_leaves_the_ticker_out():
+    assert endpoint_family("https://apipubaws.tcbs.com.vn/tcanalysis/v1/rating/TCB/general?fType=TICKER") == "apipubaws.tcbs.com.vn/tcanalysis/v1/rating/*/general"
+    assert endpoint_family("https://apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term?ticker=TCB") == "apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term"
+
+
+def test_slow_request_is_hedged():
+    hedger = Hedger(percentile=90, max_ratio=1, min_samples=5)
+    for _ in range(5):
+        hedger.send("bars", lambda: MagicMock())
+    answers = iter([(0.5, "slow"), (0, "fast")])
+
+    def call():
+        seconds, answer = next(answers)
+        time.sleep(seconds)
+        return MagicMock(text=answer)
+
+    assert hedger.send("bars", call).text == "fast"
+    assert hedger.hedged == 1
+
+
+def test_hedges_stay_within_the_ratio():
+    hedger = Hedger(percentile=50, max_ratio=0.1)
+    for _ in range(hedger.samples):
+        hedger.observe("bars", 0)
+    calls = []
+
+    def call():
+        calls.append(None)
+        time.sleep(0.01)
+        return MagicMock()
+
+    for _ in range(20):
+        hedger.send("bars", call)
+    assert hedger.hedged == 2
+    assert len(calls) == 22
+
+
+def test_gets_share_a_session_pooled_for_the_hedges(mocker):
+    hedger = Hedger()
+    get = mocker.patch.object(hedger.session, "get", return_value=MagicMock(status_code=200))
+    hedger.get("https://example.com/TCB")
+    hedger.get("https://example.com/ABC")
+
+    assert get.call_count == 2
+    assert hedger.session.get_adapter("https://example.com")._pool_maxsize == HEDGE_WORKERS
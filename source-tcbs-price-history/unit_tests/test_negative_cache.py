@@ -0,0 +1,55 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+import json
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+from source_tcbs_price_history.negative_cache import NegativeCache
+from source_tcbs_price_history.source import PriceHistory, Symbol
+
+URL = "https://apipubaws.tcbs.com.vn/stock-insight/v1/stock/bars-long-term?ticker={}&type=stock&resolution=D"
+
+
+def answer(ticker, status_code=200):
+    return MagicMock(ok=status_code < 400, status_code=status_code, request=MagicMock(url=URL.format(ticker)))
+
+
+def test_tickers_without_data_are_skipped_until_the_ttl_runs_out(tmp_path):
+    path = str(tmp_path / "negative.json")
+    cache = NegativeCache(path, ttl=7)
+    cache.record("XYZ", answer("XYZ", 404))
+    cache.record("ABC", answer("ABC"), found=False)
+    cache.record("ABC", answer("ABC"), found=True)
+    cache.record("EMP", answer("EMP"), found=False)
+    cache.record("ERR", answer("ERR", 503))
+    cache.save()
+
+    cache = NegativeCache(path, ttl=7)
+    assert cache.select(["TCB", "XYZ", "ABC", "EMP", "ERR"], URL.format) == (["TCB", "ABC", "ERR"], ["XYZ", "EMP"])
+
+    # A re-probe after the TTL catches a re-listing
+    family = next(iter(cache.cache))
+    cache.cache[family]["XYZ"] = (date.today() - timedelta(7)).isoformat()
+    assert not cache.skip(URL.format("XYZ"), "XYZ")
+    cache.record("XYZ", answer("XYZ"), found=True)
+    cache.save()
+    assert json.load(open(path)) == {family: {"EMP": date.today().isoformat()}}
+
+
+def test_skipped_symbols_cost_no_request(mocker, tmp_path):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,XYZ", status_code=200))
+    config = {
+        "Fast mode": False,
+        "Symbol URL": "https://example.com/symbol.txt",
+        "Day offset": 0,
+        "Backfill window": 0,
+        "Negative cache": str(tmp_path / "negative.json"),
+    }
+    price_history = PriceHistory(parent=Symbol(config=config), config=config)
+    price_history.negative_cache.record("XYZ", answer("XYZ", 404))
+    price_history.negative_cache.save()
+    price_history.parent.read_records = MagicMock(return_value=iter(["TCB", "XYZ"]))
+
+    assert [stream_slice.get("ticker") for stream_slice in price_history.stream_slices()] == ["TCB", None]
@@ -0,0 +1,105 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from concurrent.futures import Future
+from datetime import date
+from unittest.mock import MagicMock
+
+from airbyte_cdk.models import SyncMode
+from pytest import fixture
+from source_tcbs_price_history.source import PriceHistory, Symbol, window_bars
+
+
+def bar(trading_date, close=27000):
+    "Bar as served by the API"
+    return {"open": close, "high": close, "low": close, "close": close, "volume": 100, "tradingDate": f"{trading_date}T00:00:00.000Z"}
+
+
+def window(*trading_dates):
+    "Decoded bars-long-term answer holding a bar for each date, in the given order"
+    return {"ticker": "TCB", "data": [bar(trading_date) for trading_date in trading_dates]}
+
+
+@fixture
+def price_history(mocker):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC"))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Day offset": 0, "Backfill window": 365}
+    return PriceHistory(parent=Symbol(config=config), config=config)
+
+
+def test_window_bars_keep_bars_later_than_the_ones_before():
+    bars, dates = window_bars(window("2023-07-03", "2023-06-30", "2023-07-04", "2023-07-04", "2023-07-05"), "TCB")
+    assert dates == ["2023-07-03", "2023-07-04", "2023-07-05"]
+    assert [record["tradingDate"][:10] for record in bars] == dates
+    assert all(record["ticker"] == "TCB" for record in bars)
+
+
+def test_parse_response_skips_bars_up_to_the_cursor(price_history):
+    price_history.update_cursor("TCB", date(2023, 7, 4))
+    response = MagicMock(ok=True, status_code=200)
+    response.json.return_value = window("2023-07-03", "2023-07-04", "2023-07-05", "2023-07-06")
+
+    records = list(price_history.parse_response(response, stream_slice={"ticker": "TCB", "from": "2023-07-04", "to": "2023-07-06"}))
+    assert [record["tradingDate"][:10] for record in records] == ["2023-07-05", "2023-07-06"]
+    assert price_history.state["cursors"] == {"2023-07-06": "TCB", "2000-01-01": "ABC"}
+
+
+def test_parse_response_keeps_the_emission_of_non_monotonic_bars(price_history):
+    price_history.update_cursor("TCB", date(2023, 7, 3))
+    response = MagicMock(ok=True, status_code=200)
+    # A bar older than one emitted before it, or repeating its date, is not emitted
+    response.json.return_value = window("2023-07-05", "2023-07-04", "2023-07-05", "2023-07-06")
+
+    records = list(price_history.parse_response(response, stream_slice={"ticker": "TCB", "from": "2023-07-03", "to": "2023-07-06"}))
+    assert [record["tradingDate"][:10] for record in records] == ["2023-07-05", "2023-07-06"]
+
+
+def test_parse_response_moves_the_cursor_once_per_response(price_history, mocker):
+    price_history.update_cursor("TCB", date(2023, 7, 3))
+    update_cursor = mocker.spy(price_history, "update_cursor")
+    response = MagicMock(ok=True, status_code=200)
+    response.json.return_value = window("2023-07-04", "2023-07-05", "2023-07-06")
+
+    list(price_history.parse_response(response, stream_slice={"ticker": "TCB", "from": "2023-07-03", "to": "2023-07-06"}))
+    update_cursor.assert_called_once_with("TCB", date(2023, 7, 6))
+
+    # A response without a bar after the cursor leaves it where it was
+    response.json.return_value = window("2023-07-05", "2023-07-06")
+    list(price_history.parse_response(response, stream_slice={"ticker": "TCB", "from": "2023-07-06", "to": "2023-07-06"}))
+    update_cursor.assert_called_once()
+
+
+def test_prefetched_error_is_requested_again_with_retries(price_history, mocker):
+    read_records = mocker.patch("source_tcbs_price_history.source.HttpStream.read_records", return_value=iter([]))
+    stream_slice = {"ticker": "TCB", "from": "2023-07-03", "to": "2023-07-06"}
+    url = price_history.bars_url("TCB", "2023-07-03", "2023-07-06")
+    prefetched = Future()
+    prefetched.set_result((MagicMock(ok=False, status_code=502), None))
+    price_history._prefetched[url] = prefetched
+
+    assert list(price_history.read_records(SyncMode.incremental, stream_slice=stream_slice)) == []
+    read_records.assert_called_once()
+    assert url not in price_history._prefetched
+
+
+def test_failed_first_window_of_a_new_symbol_is_a_gap(price_history):
+    failed = MagicMock(ok=False, status_code=502)
+    list(price_history.parse_response(failed, stream_slice={"ticker": "TCB", "from": "2000-01-01", "to": "2000-01-07"}))
+    response = MagicMock(ok=True, status_code=200)
+    response.json.return_value = window("2000-01-10", "2000-01-11")
+    list(price_history.parse_response(response, stream_slice={"ticker": "TCB", "from": "2000-01-07", "to": "2000-01-11"}))
+
+    # The second window answered for 2000-01-07 without a bar, that day was not traded
+    assert price_history.gaps.ranges("TCB") == [("2000-01-03", "2000-01-06")]
+    assert price_history.state["cursors"]["2000-01-11"] == "TCB"
+
+
+def test_weekday_without_a_bar_inside_an_answered_window_is_not_a_gap(price_history):
+    price_history.update_cursor("TCB", date(2023, 6, 30))
+    response = MagicMock(ok=True, status_code=200)
+    # 2023-07-04 has no bar, the symbol was suspended that day
+    response.json.return_value = window("2023-07-03", "2023-07-05")
+    list(price_history.parse_response(response, stream_slice={"ticker": "TCB", "from": "2023-06-30", "to": "2023-07-06"}))
+
+    assert price_history.gaps.ranges("TCB") == [("2023-07-06", "2023-07-06")]
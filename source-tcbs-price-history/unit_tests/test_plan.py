@@ -0,0 +1,30 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from source_tcbs_price_history.cost_profile import CostProfile
+from source_tcbs_price_history.plan import format_rows, stream_state
+
+
+def test_stream_state_from_state_messages_and_legacy_state():
+    value = {"version": 2, "cursors": {"2023-06-23": "TCB"}, "gaps": {}}
+    messages = [{"type": "STREAM", "stream": {"stream_descriptor": {"name": "price_history"}, "stream_state": value}}]
+    assert stream_state(messages, "price_history") == value
+    assert stream_state(messages, "other") is None
+    assert stream_state({"price_history": value}, "price_history") == value
+    assert stream_state(value, "price_history") == value
+    assert stream_state(None, "price_history") is None
+
+
+def test_format_rows_estimates_known_symbols():
+    cost_profile = CostProfile()
+    cost_profile.profile = {"TCB": {"requests": 1, "bytes": 20000, "seconds": 0.5}}
+    rows = [
+        {"ticker": "TCB", "slices": 3, "requests": 3},
+        {"ticker": "ABC", "slices": 0, "requests": 0},
+        {"ticker": "XYZ", "slices": None, "requests": None},
+    ]
+    lines = list(format_rows("price_history", rows, cost_profile))
+    assert lines[0] == "price_history: 3 symbols, 3 slices, 3 requests, 60 KB, 2 s of requests (1 symbols without estimate)"
+    assert lines[1].split() == ["TCB", "3", "slices", "3", "requests", "60", "KB", "1.5", "s"]
+    assert lines[3].split() == ["XYZ", "?", "slices", "?", "requests", "?", "?"]
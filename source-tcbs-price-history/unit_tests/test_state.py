@@ -0,0 +1,36 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from datetime import date
+
+import pytest
+from source_tcbs_price_history.state import decode_pending, decode_state, encode_state
+
+
+def test_encode_state_groups_symbols_by_cursor():
+    cursor_value = {"TCB": date(2023, 6, 23), "ABC": date(2023, 6, 23), "XYZ": date(2000, 1, 1)}
+    expected_state = {"version": 2, "cursors": {"2023-06-23": "TCB,ABC", "2000-01-01": "XYZ"}, "gaps": {}, "pending": "", "retired": {}}
+    assert encode_state(cursor_value) == expected_state
+
+
+def test_decode_state_round_trip():
+    cursor_value = {"TCB": date(2023, 6, 23), "ABC": date(2023, 6, 22)}
+    assert decode_state(encode_state(cursor_value)) == {"TCB": "2023-06-23", "ABC": "2023-06-22"}
+
+
+def test_decode_legacy_state():
+    legacy_state = {"TCB": "2023-06-23", "ABC": "2023-06-22T00:00:00.000Z"}
+    assert decode_state(legacy_state) == {"TCB": "2023-06-23", "ABC": "2023-06-22"}
+
+
+def test_decode_unknown_version():
+    with pytest.raises(ValueError):
+        decode_state({"version": 99, "cursors": {}})
+
+
+def test_decode_pending():
+    cursor_value = {"TCB": date(2023, 6, 23), "ABC": date(2023, 6, 22)}
+    assert decode_pending(encode_state(cursor_value, pending=["ABC", "TCB"])) == ["ABC", "TCB"]
+    assert decode_pending(encode_state(cursor_value)) == []
+    assert decode_pending({"TCB": "2023-06-23"}) == []
@@ -0,0 +1,120 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest import fixture
+from source_tcbs_price_history.hedging import Hedger
+from source_tcbs_price_history.source import PriceHistory, Symbol
+from source_tcbs_price_history.state import decode_retired
+from source_tcbs_price_history.universe import SymbolUniverse, organization_symbols
+
+ORGANIZATIONS = [
+    {"ticker": "TCB", "comGroupCode": "HOSE", "comTypeCode": "NH", "icbCode": "8355"},
+    {"ticker": "VNM", "comGroupCode": "HOSE", "comTypeCode": "CT"},
+    {"ticker": "E1VFVN30", "comGroupCode": "HOSE", "comTypeCode": "QU"},
+    {"ticker": "ABC", "comGroupCode": "UPCOM", "comTypeCode": "CT"},
+]
+
+
+@fixture
+def price_history(mocker):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC,NEW,BACK", status_code=200))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Day offset": 0, "Backfill window": 365}
+    return PriceHistory(parent=Symbol(config=config), config=config)
+
+
+def test_previous_universe_is_diffed_against_the_symbol_file(price_history):
+    price_history.state = {
+        "version": 2,
+        "cursors": {"2023-06-23": "TCB,ABC,GONE"},
+        "retired": {"2021-03-01": "BACK,OLD"},
+    }
+
+    assert price_history._cursor_value["BACK"].isoformat() == "2021-03-01"
+    assert price_history._cursor_value["NEW"].isoformat() == "2000-01-01"
+    assert price_history._listings == ["NEW", "BACK"]
+    assert decode_retired(price_history.state) == {"GONE": "2023-06-23", "OLD": "2021-03-01"}
+
+
+def test_first_run_has_no_listings(price_history):
+    price_history.state = {}
+    assert price_history._listings == []
+    assert decode_retired(price_history.state) == {}
+
+
+def test_listings_are_backfilled_in_their_own_lane(price_history):
+    price_history.parent.read_records = MagicMock(return_value=iter(["TCB", "ABC", "NEW"]))
+    previous_session = price_history.calendar.previous_trading_day(price_history.end_date()).isoformat()
+    price_history.state = {"version": 2, "cursors": {previous_session: "TCB", "2000-01-01": "ABC"}}
+    prefetched = []
+    price_history.prefetch = lambda executor, record, slices: prefetched.append(record)
+    price_history.fetch_window = MagicMock(return_value=(MagicMock(ok=False, status_code=502), None))
+
+    tickers = []
+    lane = []
+    for stream_slice in price_history.stream_slices():
+        if stream_slice.get("checkpoint"):
+            continue
+        tickers.append(stream_slice["ticker"])
+        lane.append(len(price_history._prefetched))
+    assert tickers[0] == "ABC" and tickers[-1] == "NEW"
+    assert prefetched == ["ABC"]
+    # The lane started before the first slice was read, the windows nobody read are held up to twice the Backfill workers
+    # and the ones not requested yet are cancelled at the end
+    assert lane[0] == max(lane) == 8
+    assert all(call.args[1] == "NEW" for call in price_history.fetch_window.call_args_list)
+    assert price_history._prefetched == {}
+
+
+def test_organization_list_is_filtered():
+    assert organization_symbols(ORGANIZATIONS) == ["TCB", "VNM", "ABC"]
+    assert organization_symbols(ORGANIZATIONS, exchanges=["HOSE"]) == ["TCB", "VNM"]
+    assert organization_symbols(ORGANIZATIONS, types=["CT"]) == ["VNM", "ABC"]
+    assert organization_symbols(ORGANIZATIONS, equities_only=False, exchanges=["HOSE"]) == ["TCB", "VNM", "E1VFVN30"]
+
+
+def test_symbol_cache_is_used_while_fresh_and_when_the_list_fails(mocker, tmp_path):
+    config = {"Symbol URL": "https://example.com/symbol.txt", "Symbol source": "ssi", "Symbol cache": str(tmp_path / "symbols.json")}
+    get = mocker.patch("requests.Session.get", return_value=MagicMock(json=MagicMock(return_value={"items": ORGANIZATIONS})))
+    assert SymbolUniverse(config).symbols(Hedger()) == ["TCB", "VNM", "ABC"]
+    assert SymbolUniverse(config).symbols(Hedger()) == ["TCB", "VNM", "ABC"]
+    assert get.call_count == 1
+
+    get.side_effect = requests.ConnectionError("Connection refused")
+    assert SymbolUniverse(config | {"Symbol cache hours": 0}).symbols(Hedger()) == ["TCB", "VNM", "ABC"]
+    # A cache of other filters is not used
+    with pytest.raises(requests.ConnectionError):
+        SymbolUniverse(config | {"Symbol exchanges": ["HNX"]}).symbols(Hedger())
+
+
+def test_file_symbols_are_filtered_before_slicing(mocker):
+    bars = {"TCB": [{"volume": 2000000}, {"volume": 1000000}], "VNM": [{"volume": 5000}], "ABC": []}
+
+    def get(url, **kwargs):
+        if "GetListOrganization" in url:
+            return MagicMock(json=MagicMock(return_value={"items": ORGANIZATIONS + [{"ticker": "ACB", "comGroupCode": "HNX"}]}))
+        if "bars-long-term" in url:
+            ticker = url.split("ticker=")[1].split("&")[0]
+            return MagicMock(ok=True, json=MagicMock(return_value={"data": bars[ticker]}))
+        return MagicMock(text="TCB,VNM,ABC,ACB,FPT")
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    config = {"Symbol URL": "https://example.com/symbol.txt"}
+    assert SymbolUniverse(config | {"Exclude symbols": ["FPT"], "Symbol exchanges": ["HOSE", "UPCOM"]}).symbols(Hedger()) == ["TCB", "VNM", "ABC"]
+    assert SymbolUniverse(config | {"Include symbols": ["VNM", "ACB"]}).symbols(Hedger()) == ["VNM", "ACB"]
+    assert SymbolUniverse(config | {"Symbol industries": ["83"]}).symbols(Hedger()) == ["TCB"]
+    assert SymbolUniverse(config | {"Symbol exchanges": ["HOSE"], "Minimum average volume": 10000}).symbols(Hedger()) == ["TCB"]
+
+
+def test_symbol_list_is_requested_once_per_sync(mocker):
+    get = mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC", status_code=200))
+    config = {"Fast mode": False, "Symbol URL": "https://example.com/symbol.txt", "Day offset": 0}
+    price_history = PriceHistory(parent=Symbol(config=config), config=config)
+
+    assert price_history.universe is price_history.parent.universe
+    assert list(price_history.parent.read_records(sync_mode=None)) == ["TCB", "ABC"]
+    assert get.call_count == 1
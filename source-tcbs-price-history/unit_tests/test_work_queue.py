@@ -0,0 +1,74 @@
+#
+# Copyright (c) 2023 Airbyte, Inc., all rights reserved.
+#
+
+from unittest.mock import MagicMock
+
+from source_tcbs_price_history.source import PriceHistory, Symbol
+from source_tcbs_price_history.work_queue import WorkQueue
+
+
+def test_workers_lease_each_item_once(tmp_path):
+    path = str(tmp_path / "queue.db")
+    first, second = WorkQueue(path, "price_history"), WorkQueue(path, "price_history")
+    for queue in (first, second):
+        queue.start("2023-06-23")
+        queue.seed(["TCB", "ABC", "VNM"])
+
+    assert first.lease_next() == "TCB"
+    assert second.lease_next() == "ABC"
+    first.ack("TCB", "2023-06-23")
+    second.release("ABC")
+    assert list(first.claim()) == ["ABC", "VNM"]
+    assert second.cursors() == {"TCB": "2023-06-23"}
+
+
+def test_expired_lease_is_leased_again(tmp_path):
+    path = str(tmp_path / "queue.db")
+    crashed, worker = WorkQueue(path, "price_history", lease=0), WorkQueue(path, "price_history")
+    for queue in (crashed, worker):
+        queue.start("2023-06-23")
+    crashed.seed(["TCB"])
+
+    assert crashed.lease_next() == "TCB"
+    assert worker.lease_next() == "TCB"
+    assert worker.lease_next() is None
+
+
+def test_newer_run_drops_the_queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), "price_history")
+    queue.start("2023-06-22")
+    queue.seed(["TCB"])
+    queue.ack("TCB", "2023-06-22")
+
+    queue.start("2023-06-23")
+    assert queue.cursors() == {}
+    queue.seed(["ABC"])
+    assert list(queue.claim()) == ["ABC"]
+
+
+def test_workers_split_the_symbols_and_merge_cursors(mocker, tmp_path):
+    mocker.patch("requests.Session.get", return_value=MagicMock(text="TCB,ABC,VNM"))
+    config = {
+        "Fast mode": False,
+        "Symbol URL": "https://example.com/symbol.txt",
+        "Day offset": 0,
+        "Backfill window": 0,
+        "Work queue": str(tmp_path / "queue.db"),
+    }
+    workers = [PriceHistory(parent=Symbol(config=config), config=config) for _ in range(2)]
+    for worker in workers:
+        worker.parent.read_records = MagicMock(return_value=iter(["TCB", "ABC", "VNM"]))
+    slices = [worker.stream_slices() for worker in workers]
+
+    read = []
+    for turn in (0, 1, 0, 1, 0):
+        stream_slice = next(slices[turn], None)
+        if stream_slice is not None and not stream_slice.get("checkpoint"):
+            read.append((turn, stream_slice["ticker"]))
+            workers[turn].update_cursor(stream_slice["ticker"], workers[turn].str_to_date(stream_slice["to"]))
+
+    assert read == [(0, "TCB"), (1, "ABC"), (0, "VNM")]
+    end_date = workers[0].end_date()
+    assert workers[0]._cursor_value == {"TCB": end_date, "ABC": end_date, "VNM": end_date}
+    assert workers[1]._cursor_value["TCB"] == end_date